@@ -19,32 +19,38 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Create ENUM types (checkfirst=True prevents duplicates)
-    user_role_enum = postgresql.ENUM('admin', 'operator', 'viewer', name='userrole', create_type=False)
-    user_role_enum.create(op.get_bind(), checkfirst=True)
+    # La migración inicial es atómica: no hace falta esperar el fsync del WAL
+    # en cada commit intermedio. SET LOCAL solo afecta a esta transacción.
+    op.execute("SET LOCAL synchronous_commit = off")
 
-    document_status_enum = postgresql.ENUM('active', 'archived', 'deleted', name='documentstatus', create_type=False)
-    document_status_enum.create(op.get_bind(), checkfirst=True)
+    # citext: comparaciones de email sin distinguir mayúsculas usando el índice normal
+    op.execute("CREATE EXTENSION IF NOT EXISTS citext")
 
-    priority_enum = postgresql.ENUM('low', 'medium', 'high', name='priority', create_type=False)
-    priority_enum.create(op.get_bind(), checkfirst=True)
+    # Los valores enumerados se guardan como VARCHAR + CHECK en lugar de ENUM nativo:
+    # agregar un valor es un DROP/ADD CONSTRAINT transaccional, sin ALTER TYPE.
 
     # Create users table
     op.create_table('users',
         sa.Column('id', sa.Integer(), nullable=False),
-        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('email', postgresql.CITEXT(), nullable=False),
         sa.Column('name', sa.String(length=255), nullable=False),
         sa.Column('microsoft_id', sa.String(length=255), nullable=True),
-        sa.Column('role', user_role_enum, nullable=False),
+        sa.Column('role', sa.String(length=16), nullable=False),
         sa.Column('is_active', sa.Boolean(), nullable=True),
         sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
-        sa.Column('profile_data', sa.JSON(), nullable=True),
+        sa.Column('profile_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.CheckConstraint("role IN ('admin', 'operator', 'viewer')", name='ck_users_role'),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
-    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    # Email único solo entre usuarios activos: un usuario desactivado no bloquea
+    # su email. El índice no único atiende búsquedas por emails históricos.
+    op.create_index(
+        'ix_users_email_active', 'users', ['email'], unique=True,
+        postgresql_where=sa.text('is_active = true')
+    )
+    op.create_index('ix_users_email_lookup', 'users', ['email'], unique=False)
     op.create_index(op.f('ix_users_microsoft_id'), 'users', ['microsoft_id'], unique=True)
 
     # Create document_types table
@@ -52,51 +58,61 @@ def upgrade() -> None:
         sa.Column('id', sa.Integer(), nullable=False),
         sa.Column('name', sa.String(length=100), nullable=False),
         sa.Column('description', sa.Text(), nullable=True),
-        sa.Column('file_extensions', sa.JSON(), nullable=True),
+        sa.Column('file_extensions', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('max_file_size', sa.Integer(), nullable=True),
         sa.Column('template_path', sa.String(length=500), nullable=True),
-        sa.Column('qr_position', sa.JSON(), nullable=True),
+        sa.Column('qr_position', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('is_active', sa.Boolean(), nullable=True),
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_document_types_id'), 'document_types', ['id'], unique=False)
     op.create_index(op.f('ix_document_types_name'), 'document_types', ['name'], unique=True)
 
     # Create documents table
+    # Columnas ordenadas por alineación (8 bytes, 4 bytes, longitud variable)
+    # para evitar relleno entre columnas en cada fila
     op.create_table('documents',
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_type_id', sa.Integer(), nullable=False),
+        sa.Column('uploaded_by', sa.Integer(), nullable=False),
         sa.Column('title', sa.String(length=255), nullable=False),
         sa.Column('description', sa.Text(), nullable=True),
         sa.Column('file_name', sa.String(length=255), nullable=False),
         sa.Column('original_file_name', sa.String(length=255), nullable=False),
         sa.Column('file_path', sa.String(length=500), nullable=False),
-        sa.Column('file_size', sa.Integer(), nullable=False),
         sa.Column('file_type', sa.String(length=50), nullable=False),
         sa.Column('mime_type', sa.String(length=100), nullable=False),
-        sa.Column('document_type_id', sa.Integer(), nullable=False),
-        sa.Column('uploaded_by', sa.Integer(), nullable=False),
-        sa.Column('tags', sa.JSON(), nullable=True),
-        sa.Column('metadata', sa.JSON(), nullable=True),
-        sa.Column('status', document_status_enum, nullable=False),
-        sa.Column('priority', priority_enum, nullable=False),
+        sa.Column('tags', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('metadata', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('priority', sa.String(length=16), nullable=False),
         sa.Column('onedrive_file_id', sa.String(length=255), nullable=True),
         sa.Column('onedrive_path', sa.String(length=500), nullable=True),
         sa.Column('processing_status', sa.String(length=50), nullable=True),
         sa.Column('error_message', sa.Text(), nullable=True),
-        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
-        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
         sa.ForeignKeyConstraint(['document_type_id'], ['document_types.id'], ),
         sa.ForeignKeyConstraint(['uploaded_by'], ['users.id'], ),
+        sa.CheckConstraint("status IN ('active', 'archived', 'deleted')", name='ck_documents_status'),
+        sa.CheckConstraint("priority IN ('low', 'medium', 'high')", name='ck_documents_priority'),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_documents_document_type_id'), 'documents', ['document_type_id'], unique=False)
+    # Los índices de claves foráneas se crean en 20251016_fk_indexes (CONCURRENTLY)
     op.create_index(op.f('ix_documents_file_name'), 'documents', ['file_name'], unique=True)
-    op.create_index(op.f('ix_documents_id'), 'documents', ['id'], unique=False)
-    op.create_index(op.f('ix_documents_status'), 'documents', ['status'], unique=False)
+    # Índice parcial: solo los documentos activos, que son los que se consultan
+    op.create_index(
+        'ix_documents_status_active', 'documents', ['status'], unique=False,
+        postgresql_where=sa.text("status = 'active'")
+    )
     op.create_index(op.f('ix_documents_title'), 'documents', ['title'], unique=False)
-    op.create_index(op.f('ix_documents_uploaded_by'), 'documents', ['uploaded_by'], unique=False)
+    # BRIN sobre created_at: índice mínimo para consultas por rango de fechas
+    op.create_index(
+        'ix_documents_created_at_brin', 'documents', ['created_at'],
+        postgresql_using='brin', postgresql_with={'pages_per_range': 32}
+    )
 
     # Create qr_codes table
     op.create_table('qr_codes',
@@ -105,7 +121,7 @@ def upgrade() -> None:
         sa.Column('qr_data', sa.Text(), nullable=False),
         sa.Column('qr_image_path', sa.String(length=500), nullable=True),
         sa.Column('qr_code', sa.String(length=100), nullable=False),
-        sa.Column('position_data', sa.JSON(), nullable=True),
+        sa.Column('position_data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
         sa.Column('generated_by', sa.Integer(), nullable=False),
         sa.Column('scan_count', sa.Integer(), nullable=True),
         sa.Column('last_scanned_at', sa.DateTime(timezone=True), nullable=True),
@@ -116,41 +132,40 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(['generated_by'], ['users.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_qr_codes_document_id'), 'qr_codes', ['document_id'], unique=False)
-    op.create_index(op.f('ix_qr_codes_id'), 'qr_codes', ['id'], unique=False)
     op.create_index(op.f('ix_qr_codes_qr_code'), 'qr_codes', ['qr_code'], unique=True)
+    op.create_index(
+        'ix_qr_codes_created_at_brin', 'qr_codes', ['created_at'],
+        postgresql_using='brin', postgresql_with={'pages_per_range': 32}
+    )
 
+    # Compresión LZ4 (PostgreSQL 14+) para las columnas de rutas: descompresión
+    # más rápida que pglz. Se fija por columna porque default_toast_compression
+    # se evalúa en cada sesión al escribir, no al crear la tabla.
+    op.execute("ALTER TABLE document_types ALTER COLUMN template_path SET COMPRESSION lz4")
+    op.execute(
+        "ALTER TABLE documents "
+        "ALTER COLUMN file_path SET COMPRESSION lz4, "
+        "ALTER COLUMN onedrive_file_id SET COMPRESSION lz4, "
+        "ALTER COLUMN onedrive_path SET COMPRESSION lz4"
+    )
+    op.execute("ALTER TABLE qr_codes ALTER COLUMN qr_image_path SET COMPRESSION lz4")
 
 def downgrade() -> None:
     # Drop tables in reverse order
+    op.drop_index('ix_qr_codes_created_at_brin', table_name='qr_codes')
     op.drop_index(op.f('ix_qr_codes_qr_code'), table_name='qr_codes')
-    op.drop_index(op.f('ix_qr_codes_id'), table_name='qr_codes')
-    op.drop_index(op.f('ix_qr_codes_document_id'), table_name='qr_codes')
     op.drop_table('qr_codes')
     
-    op.drop_index(op.f('ix_documents_uploaded_by'), table_name='documents')
+    op.drop_index('ix_documents_created_at_brin', table_name='documents')
     op.drop_index(op.f('ix_documents_title'), table_name='documents')
-    op.drop_index(op.f('ix_documents_status'), table_name='documents')
-    op.drop_index(op.f('ix_documents_id'), table_name='documents')
+    op.drop_index('ix_documents_status_active', table_name='documents')
     op.drop_index(op.f('ix_documents_file_name'), table_name='documents')
-    op.drop_index(op.f('ix_documents_document_type_id'), table_name='documents')
     op.drop_table('documents')
     
     op.drop_index(op.f('ix_document_types_name'), table_name='document_types')
-    op.drop_index(op.f('ix_document_types_id'), table_name='document_types')
     op.drop_table('document_types')
     
     op.drop_index(op.f('ix_users_microsoft_id'), table_name='users')
-    op.drop_index(op.f('ix_users_id'), table_name='users')
-    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_index('ix_users_email_lookup', table_name='users')
+    op.drop_index('ix_users_email_active', table_name='users')
     op.drop_table('users')
-    
-    # Drop ENUM types
-    priority_enum = postgresql.ENUM('low', 'medium', 'high', name='priority')
-    priority_enum.drop(op.get_bind())
-    
-    document_status_enum = postgresql.ENUM('active', 'archived', 'deleted', name='documentstatus')
-    document_status_enum.drop(op.get_bind())
-    
-    user_role_enum = postgresql.ENUM('admin', 'operator', 'viewer', name='userrole')
-    user_role_enum.drop(op.get_bind())
\ No newline at end of file
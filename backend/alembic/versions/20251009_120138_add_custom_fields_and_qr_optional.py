@@ -17,29 +17,24 @@ depends_on = None
 
 
 def upgrade() -> None:
+    # Las columnas se agregan con server_default y NOT NULL: en PostgreSQL 11+
+    # el valor por defecto queda en el catálogo, sin reescribir la tabla ni
+    # rellenar las filas existentes con UPDATE.
+
     # Add custom_fields column to document_types table
     op.add_column('document_types',
-        sa.Column('custom_fields', postgresql.JSON(astext_type=sa.Text()), nullable=True)
+        sa.Column('custom_fields', postgresql.JSON(astext_type=sa.Text()), nullable=False,
+                  server_default=sa.text("'[]'::json"))
     )
 
     # Add QR optional tracking columns to documents table
     op.add_column('documents',
-        sa.Column('tiene_qr', sa.Boolean(), nullable=True, default=False)
+        sa.Column('tiene_qr', sa.Boolean(), nullable=False, server_default=sa.false())
     )
     op.add_column('documents',
-        sa.Column('qr_extraction_success', sa.Boolean(), nullable=True, default=False)
+        sa.Column('qr_extraction_success', sa.Boolean(), nullable=False, server_default=sa.false())
     )
 
-    # Set default values for existing rows
-    op.execute("UPDATE document_types SET custom_fields = '[]' WHERE custom_fields IS NULL")
-    op.execute("UPDATE documents SET tiene_qr = false WHERE tiene_qr IS NULL")
-    op.execute("UPDATE documents SET qr_extraction_success = false WHERE qr_extraction_success IS NULL")
-
-    # Make columns non-nullable after setting defaults
-    op.alter_column('document_types', 'custom_fields', nullable=False)
-    op.alter_column('documents', 'tiene_qr', nullable=False)
-    op.alter_column('documents', 'qr_extraction_success', nullable=False)
-
 
 def downgrade() -> None:
     # Remove columns added in upgrade
@@ -6,7 +6,6 @@ Create Date: 2025-10-14
 
 """
 from alembic import op
-import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
@@ -17,21 +16,22 @@ depends_on = None
 
 
 def upgrade():
-    # Agregar campos para autenticación local
-    op.add_column('users', sa.Column('password_hash', sa.String(length=255), nullable=True))
-    op.add_column('users', sa.Column('is_local_user', sa.Boolean(), nullable=True, server_default='false'))
-
-    # Modificar azure_id para permitir NULL (usuarios locales no tienen Azure ID)
-    op.alter_column('users', 'azure_id',
-                    existing_type=sa.String(length=255),
-                    nullable=True)
+    # Un solo ALTER TABLE: el lock ACCESS EXCLUSIVE se toma una vez para los tres cambios
+    op.execute(
+        "ALTER TABLE users "
+        # Agregar campos para autenticación local
+        "ADD COLUMN password_hash VARCHAR(255), "
+        "ADD COLUMN is_local_user BOOLEAN DEFAULT false, "
+        # Modificar azure_id para permitir NULL (usuarios locales no tienen Azure ID)
+        "ALTER COLUMN azure_id DROP NOT NULL"
+    )
 
 
 def downgrade():
     # Revertir cambios
-    op.alter_column('users', 'azure_id',
-                    existing_type=sa.String(length=255),
-                    nullable=False)
-
-    op.drop_column('users', 'is_local_user')
-    op.drop_column('users', 'password_hash')
+    op.execute(
+        "ALTER TABLE users "
+        "ALTER COLUMN azure_id SET NOT NULL, "
+        "DROP COLUMN is_local_user, "
+        "DROP COLUMN password_hash"
+    )
@@ -0,0 +1,31 @@
+"""add text_pattern_ops index for document type code prefix search
+
+Revision ID: 20251016_dt_code_prefix
+Revises: 20251016_dt_filters
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_dt_code_prefix'
+down_revision = '20251016_dt_filters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /document-types?search=: WHERE code LIKE 'ABC%' (los códigos se guardan
+    # en mayúsculas); el índice único de code no sirve para LIKE fuera de la
+    # collation C
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_document_types_code_prefix "
+            "ON document_types (code text_pattern_ops)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_document_types_code_prefix")
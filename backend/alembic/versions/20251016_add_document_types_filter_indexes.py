@@ -0,0 +1,45 @@
+"""add filter and trigram search indexes for document types listing
+
+Revision ID: 20251016_dt_filters
+Revises: 20251016_dt_keyset
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_dt_filters'
+down_revision = '20251016_dt_keyset'
+branch_labels = None
+depends_on = None
+
+
+# GET /document-types: filtros is_active / can_generate / created_by y búsqueda
+# ILIKE '%texto%' sobre code, name y description (un índice trigram por columna
+# para que el OR de los tres se resuelva con BitmapOr)
+FILTER_INDEXES = (
+    ('ix_document_types_active_sort', 'btree (is_active, sort_order, id)'),
+    ('ix_document_types_generatable',
+     'btree (sort_order) WHERE template_path IS NOT NULL AND is_active'),
+    ('ix_document_types_created_by_id', 'btree (created_by, id)'),
+    ('ix_document_types_code_trgm', 'gin (code gin_trgm_ops)'),
+    ('ix_document_types_name_trgm', 'gin (name gin_trgm_ops)'),
+    ('ix_document_types_description_trgm', 'gin (description gin_trgm_ops)'),
+)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for index_name, definition in FILTER_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON document_types USING {definition}"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index_name, _ in reversed(FILTER_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,40 @@
+"""add (sort column, id) indexes for document types keyset pagination
+
+Revision ID: 20251016_dt_keyset
+Revises: 20251016_users_local_email
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_dt_keyset'
+down_revision = '20251016_users_local_email'
+branch_labels = None
+depends_on = None
+
+
+# GET /document-types?cursor=...: WHERE (col, id) > (:v, :id) ORDER BY col, id
+KEYSET_INDEXES = {
+    "ix_document_types_name_id": "name, id",
+    "ix_document_types_created_at_id": "created_at, id",
+    "ix_document_types_updated_at_id": "updated_at, id",
+    "ix_document_types_documents_count_id": "documents_count, id",
+    "ix_document_types_sort_order_id": "sort_order, id",
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for index_name, columns in KEYSET_INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON document_types ({columns})"
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index_name in KEYSET_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -0,0 +1,37 @@
+"""add GIN index on documents.tags
+
+Revision ID: 20251016_tags_gin
+Revises: 20251016_fk_indexes
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_tags_gin'
+down_revision = '20251016_fk_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bases creadas antes del cambio a JSONB tienen tags como json; GIN requiere jsonb.
+    # Si la columna ya es jsonb PostgreSQL no reescribe la tabla.
+    op.alter_column('documents', 'tags',
+                    type_=postgresql.JSONB(astext_type=sa.Text()),
+                    postgresql_using='tags::jsonb')
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_tags_gin "
+            "ON documents USING gin (tags)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_tags_gin")
@@ -0,0 +1,29 @@
+"""add qr_codes generated_by index
+
+Revision ID: 20251016_qr_generated_by
+Revises: 20251016_tags_gin
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_qr_generated_by'
+down_revision = '20251016_tags_gin'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Verificación de dueño del QR y estadísticas por usuario
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_qr_codes_generated_by "
+            "ON qr_codes (generated_by)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_qr_codes_generated_by")
@@ -0,0 +1,29 @@
+"""add partial index for local user login
+
+Revision ID: 20251016_users_local_email
+Revises: 20251016_qr_generated_by
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_users_local_email'
+down_revision = '20251016_qr_generated_by'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Login local: WHERE email = :email AND is_local_user
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_local_email "
+            "ON users (email) WHERE is_local_user"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_local_email")
@@ -0,0 +1,48 @@
+"""index COALESCE(col, 0) for the nullable document type sort columns
+
+Revision ID: 20251016_dt_sort_coalesce
+Revises: 20251016_dt_code_prefix
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_dt_sort_coalesce'
+down_revision = '20251016_dt_code_prefix'
+branch_labels = None
+depends_on = None
+
+
+# documents_count y sort_order admiten NULL: el listado ordena y pagina por
+# COALESCE(col, 0), así que los índices de keyset pasan a esa expresión
+SORT_INDEXES = {
+    "ix_document_types_documents_count_id": (
+        "COALESCE(documents_count, 0), id", "documents_count, id"
+    ),
+    "ix_document_types_sort_order_id": (
+        "COALESCE(sort_order, 0), id", "sort_order, id"
+    ),
+    "ix_document_types_active_sort": (
+        "is_active, COALESCE(sort_order, 0), id", "is_active, sort_order, id"
+    ),
+}
+
+
+def _recreate_indexes(position: int) -> None:
+    with op.get_context().autocommit_block():
+        for index_name, definitions in SORT_INDEXES.items():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON document_types ({definitions[position]})"
+            )
+
+
+def upgrade():
+    _recreate_indexes(0)
+
+
+def downgrade():
+    _recreate_indexes(1)
@@ -0,0 +1,55 @@
+"""create foreign key indexes concurrently
+
+Revision ID: 20251016_fk_indexes
+Revises: 20251014_local_auth
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '20251016_fk_indexes'
+down_revision = '20251014_local_auth'
+branch_labels = None
+depends_on = None
+
+
+# Índices que soportan las claves foráneas. Se construyen después de la carga
+# inicial de datos y con CONCURRENTLY para no bloquear escrituras cuando la
+# migración se ejecuta sobre una base de datos ya poblada.
+FK_INDEXES = (
+    ('ix_documents_document_type_id', 'documents', 'document_type_id'),
+    # Compuesto: sirve la búsqueda por usuario y el orden "más recientes primero"
+    ('ix_documents_uploaded_by_created', 'documents', 'uploaded_by, created_at DESC'),
+    ('ix_qr_codes_document_id', 'qr_codes', 'document_id'),
+)
+
+# Índices reemplazados por los anteriores (el prefijo del compuesto los cubre)
+LEGACY_INDEXES = (
+    ('ix_documents_uploaded_by', 'documents', 'uploaded_by'),
+)
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for index_name, table_name, columns in FK_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table_name} ({columns})"
+            )
+        for index_name, _, _ in LEGACY_INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        # Restaurar los índices reemplazados antes de quitar los que los cubren
+        for index_name, table_name, columns in LEGACY_INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} "
+                f"ON {table_name} ({columns})"
+            )
+        for index_name, _, _ in reversed(FK_INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
@@ -2,22 +2,32 @@
 Dependencias compartidas para endpoints de SGD Web
 Autenticación, autorización y utilidades comunes
 """
+import hashlib
+import json
 import logging
-from typing import Generator, Optional, List, Any
-from datetime import datetime, timedelta
-
-from fastapi import Depends, HTTPException, status, Request, Query, Path
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from operator import attrgetter
+from typing import Annotated, Optional, List, Any
+from datetime import datetime
+
+from fastapi import Depends, HTTPException, status, Request, Query, Path, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session, make_transient_to_detached
+import jwt
+from jwt.algorithms import get_default_algorithms
 
-from ..database import get_db
+from ..database import get_db, SessionLocal
 from ..config import get_settings
 from ..models.user import User, UserRole, UserStatus
 from ..models.document_type import DocumentType
 from ..models.document import Document
 from ..models.qr_code import QRCode
 from ..schemas.user import UserPermissions
+from ..utils.cache import TTLCache, get_redis_client
 
 # Configuración
 settings = get_settings()
@@ -26,18 +36,286 @@ logger = logging.getLogger(__name__)
 # Esquema de autenticación
 security = HTTPBearer(auto_error=False)
 
+# Encabezado de los 401 (compartido; cada excepción se crea al lanzarla)
+_BEARER_HEADERS = {"WWW-Authenticate": "Bearer"}
 
-# === DEPENDENCIAS DE BASE DE DATOS ===
 
-def get_database() -> Generator[Session, None, None]:
+def _prepare_verification_key(key: str, algorithm: str):
     """
-    Dependencia para obtener sesión de base de datos
+    Preparar la clave de verificación JWT una sola vez
+    Bytes para HMAC u objeto de clave ya parseado (PEM) para RS*/ES*
     """
-    yield from get_db()
+    return get_default_algorithms()[algorithm].prepare_key(key)
+
+
+# Clave de verificación preparada al importar el módulo
+_VERIFICATION_KEY = _prepare_verification_key(settings.SECRET_KEY, settings.ALGORITHM)
+_ALGORITHMS = [settings.ALGORITHM]
+
+# Cache de payloads JWT ya verificados (clave: hash del token, no el token)
+TOKEN_CACHE_TTL = 5
+_token_cache = TTLCache(maxsize=4096, ttl=TOKEN_CACHE_TTL)
+
+# Cache de usuarios autenticados: snapshot de columnas por ID de usuario
+USER_CACHE_TTL = 30
+_user_cache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+# Columnas que se guardan en el snapshot: las que necesita la
+# autenticación/autorización (y las más usadas por los endpoints). En un
+# acierto, acceder a cualquier otra columna carga todas las restantes en un
+# único SELECT.
+_USER_COLUMNS = ("id", "email", "name", "role", "status", "is_active")
+
+# Segundo nivel compartido entre workers (Redis): un usuario resuelto por un
+# worker no vuelve a consultarse en la base de datos desde los demás. Mismo
+# TTL que el nivel local: un cambio de rol o estado que no pase por
+# invalidate_user_cache se aplica como mucho en USER_CACHE_TTL segundos.
+USER_REDIS_TTL = USER_CACHE_TTL
+
+# Respuestas serializadas por usuario (/auth/me, /auth/status) que el frontend
+# consulta en cada cambio de ruta. Se guardan en Redis si está configurado.
+USER_RESPONSE_TTL = 30
+USER_RESPONSE_KINDS = ("me", "status")
+_user_response_cache = TTLCache(maxsize=10_000, ttl=USER_RESPONSE_TTL)
+
+# Última actividad de usuarios pendiente de persistir (se escribe en lote)
+ACTIVITY_FLUSH_INTERVAL = 30
+_pending_activity: dict = {}
+_pending_activity_lock = threading.Lock()
+
+
+# === DEPENDENCIAS DE BASE DE DATOS ===
+
+# Alias (no un wrapper) de get_db: FastAPI cachea las dependencias por callable,
+# así que los endpoints que piden get_db y las dependencias de este módulo
+# comparten la misma sesión y la misma resolución de get_current_user
+get_database = get_db
 
 
 # === DEPENDENCIAS DE AUTENTICACIÓN ===
 
+def invalidate_user_cache(user_id: int) -> None:
+    """
+    Descartar el snapshot cacheado de un usuario
+    Llamar después de modificar datos que afectan la autenticación (rol, estado, etc.)
+    """
+    _user_cache.pop(user_id)
+    for kind in USER_RESPONSE_KINDS:
+        _user_response_cache.pop((kind, user_id))
+    
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.delete(
+                f"auth:user:{user_id}",
+                *(f"auth:{kind}:{user_id}" for kind in USER_RESPONSE_KINDS)
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar usuario {user_id} en Redis: {str(e)}")
+
+
+def get_cached_user_response(kind: str, user_id: int) -> Optional[bytes]:
+    """
+    Obtener una respuesta serializada cacheada para un usuario
+    
+    Args:
+        kind: Tipo de respuesta (uno de USER_RESPONSE_KINDS)
+        user_id: ID del usuario
+        
+    Returns:
+        Optional[bytes]: Cuerpo JSON o None si no está en cache
+    """
+    client = get_redis_client()
+    if client is not None:
+        try:
+            return client.get(f"auth:{kind}:{user_id}")
+        except Exception as e:
+            logger.warning(f"Error leyendo respuesta cacheada desde Redis: {str(e)}")
+    return _user_response_cache.get((kind, user_id))
+
+
+def set_cached_user_response(kind: str, user_id: int, body: bytes) -> None:
+    """Guardar una respuesta serializada (se descarta con invalidate_user_cache)"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.set(f"auth:{kind}:{user_id}", body, ex=USER_RESPONSE_TTL)
+            return
+        except Exception as e:
+            logger.warning(f"Error guardando respuesta cacheada en Redis: {str(e)}")
+    _user_response_cache.set((kind, user_id), body)
+
+
+def record_user_activity(user_id: int) -> None:
+    """
+    Registrar actividad del usuario sin escribir en base de datos
+    El valor se persiste en el siguiente flush_user_activity()
+    """
+    now = time.time()
+    with _pending_activity_lock:
+        _pending_activity[user_id] = now
+
+
+def flush_user_activity() -> int:
+    """
+    Persistir la última actividad acumulada con un único UPDATE
+    
+    Returns:
+        int: Número de usuarios actualizados
+    """
+    with _pending_activity_lock:
+        if not _pending_activity:
+            return 0
+        pending = dict(_pending_activity)
+        _pending_activity.clear()
+    
+    # Los timestamps se convierten a datetime una vez por lote, no por request
+    last_activity = {
+        user_id: datetime.utcfromtimestamp(timestamp)
+        for user_id, timestamp in pending.items()
+    }
+    
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(User)
+            .where(User.id.in_(pending.keys()))
+            .values(last_activity=case(last_activity, value=User.id))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error guardando actividad de usuarios: {str(e)}")
+        # Reencolar sin pisar actividad más reciente registrada mientras tanto
+        with _pending_activity_lock:
+            for user_id, timestamp in pending.items():
+                _pending_activity.setdefault(user_id, timestamp)
+        return 0
+    finally:
+        db.close()
+    
+    return len(pending)
+
+
+def _get_user_for_auth(db: Session, user_id: int) -> Optional[User]:
+    """
+    Obtener usuario para autenticación usando el cache de snapshots
+    
+    En un acierto del cache el usuario se adjunta a la sesión con
+    ``merge(load=False)``, sin ejecutar SELECT. El objeto resultante es una
+    instancia persistente normal de la sesión del request: si un endpoint lee
+    columnas fuera del snapshot, SQLAlchemy las carga todas juntas en un solo
+    SELECT. En un fallo se carga la fila completa (un SELECT) y solo se
+    guardan en el snapshot las columnas de _USER_COLUMNS.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        shared = _get_shared_user_snapshot(user_id)
+        if shared is not None:
+            # Solo por lo que le queda en Redis: el snapshot nunca vive más de
+            # USER_CACHE_TTL desde que se leyó de la base de datos
+            snapshot, remaining = shared
+            _user_cache.set(user_id, snapshot, ttl=remaining)
+    
+    if snapshot is not None:
+        cached_user = User(**snapshot)
+        make_transient_to_detached(cached_user)
+        return db.merge(cached_user, load=False)
+    
+    # db.get consulta primero el identity map de la sesión
+    user = db.get(User, user_id)
+    if user is not None:
+        snapshot = {key: getattr(user, key) for key in _USER_COLUMNS}
+        _user_cache.set(user_id, snapshot)
+        _set_shared_user_snapshot(user_id, snapshot)
+    return user
+
+
+def _get_shared_user_snapshot(user_id: int) -> Optional[dict]:
+    """
+    Leer el snapshot de un usuario desde Redis junto con su vida restante
+    
+    Returns:
+        Optional[tuple]: (snapshot con los enums ya reconstruidos, segundos
+        que le quedan en Redis), o None
+    """
+    client = get_redis_client()
+    if client is None:
+        return None
+    key = f"auth:user:{user_id}"
+    try:
+        # GET y PTTL en un solo round-trip
+        pipe = client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        raw, pttl = pipe.execute()
+    except Exception as e:
+        logger.warning(f"Error leyendo usuario {user_id} desde Redis: {str(e)}")
+        return None
+    if raw is None or pttl == -2:
+        return None
+    
+    snapshot = json.loads(raw)
+    snapshot["role"] = UserRole(snapshot["role"])
+    snapshot["status"] = UserStatus(snapshot["status"])
+    # -1: clave sin expiración (no debería ocurrir); se usa el TTL local
+    remaining = USER_CACHE_TTL if pttl < 0 else pttl / 1000
+    return snapshot, remaining
+
+
+def _set_shared_user_snapshot(user_id: int, snapshot: dict) -> None:
+    """Guardar el snapshot de un usuario en Redis (JSON, enums por valor)"""
+    client = get_redis_client()
+    if client is None:
+        return
+    data = dict(snapshot, role=snapshot["role"].value, status=snapshot["status"].value)
+    try:
+        client.set(f"auth:user:{user_id}", json.dumps(data), ex=USER_REDIS_TTL)
+    except Exception as e:
+        logger.warning(f"Error guardando usuario {user_id} en Redis: {str(e)}")
+
+
+def _decode_and_cache_token(token: str, cache_key: bytes) -> dict:
+    """
+    Decodificar token JWT y guardarlo en el cache hasta su expiración
+    
+    Raises:
+        jwt.InvalidTokenError: Si el token es inválido o expiró
+    """
+    # PyJWT valida firma y expiración en una sola pasada
+    payload = jwt.decode(
+        token, 
+        _VERIFICATION_KEY, 
+        algorithms=_ALGORITHMS,
+        options={"require": ["exp"]}
+    )
+    
+    # El cache nunca conserva un payload más allá de su expiración
+    _token_cache.set(cache_key, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
+def _try_verify_token(token: str) -> Optional[dict]:
+    """
+    Verificar token JWT sin lanzar excepciones
+    
+    Args:
+        token: Token JWT
+        
+    Returns:
+        Optional[dict]: Payload del token o None si es inválido
+    """
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _token_cache.get(cache_key)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
+    try:
+        return _decode_and_cache_token(token, cache_key)
+    except jwt.InvalidTokenError:
+        return None
+
+
 def verify_token(token: str) -> dict:
     """
     Verificar y decodificar token JWT
@@ -51,38 +329,32 @@ def verify_token(token: str) -> dict:
     Raises:
         HTTPException: Si el token es inválido
     """
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
-        
-        # Verificar expiración
-        exp = payload.get("exp")
-        if exp is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token sin fecha de expiración",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Verificar si ha expirado
-        if datetime.utcnow().timestamp() > exp:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token expirado",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    payload = _token_cache.get(cache_key)
+    if payload is not None and payload["exp"] > time.time():
         return payload
+
+    try:
+        return _decode_and_cache_token(token, cache_key)
         
-    except JWTError as e:
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token expirado",
+            headers=_BEARER_HEADERS
+        )
+    except jwt.MissingRequiredClaimError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token sin fecha de expiración",
+            headers=_BEARER_HEADERS
+        )
+    except jwt.InvalidTokenError as e:
         logger.warning(f"Error decodificando token: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
 
 
@@ -107,7 +379,7 @@ def get_current_user_from_token(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token de autorización requerido",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
     
     # Verificar token
@@ -119,7 +391,7 @@ def get_current_user_from_token(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido: ID de usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
 
     try:
@@ -128,16 +400,16 @@ def get_current_user_from_token(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido: ID de usuario malformado",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
     
-    # Buscar usuario en base de datos
-    user = db.query(User).filter(User.id == user_id).first()
+    # Buscar usuario (cache de snapshots o base de datos)
+    user = _get_user_for_auth(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
     
     # Verificar que el usuario esté activo
@@ -145,19 +417,18 @@ def get_current_user_from_token(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Usuario desactivado",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers=_BEARER_HEADERS
         )
     
     # Verificar estado del usuario
     if user.status == UserStatus.SUSPENDED:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Usuario suspendido",
+            detail="Usuario suspendido"
         )
     
-    # Actualizar última actividad
-    user.update_activity()
-    db.commit()
+    # Registrar última actividad (se persiste en lote, sin commit por request)
+    record_user_activity(user.id)
     
     return user
 
@@ -180,10 +451,23 @@ def get_current_user_optional(
     if not credentials:
         return None
     
+    # Mismas validaciones que get_current_user_from_token, pero sin construir
+    # ni capturar HTTPException cuando el token no sirve
+    payload = _try_verify_token(credentials.credentials)
+    if payload is None:
+        return None
+    
     try:
-        return get_current_user_from_token(credentials, db)
-    except HTTPException:
+        user_id = int(payload.get("sub"))
+    except (ValueError, TypeError):
+        return None
+    
+    user = _get_user_for_auth(db, user_id)
+    if user is None or not user.is_active or user.status == UserStatus.SUSPENDED:
         return None
+    
+    record_user_activity(user.id)
+    return user
 
 
 # Alias para mayor claridad
@@ -191,8 +475,11 @@ get_current_user = get_current_user_from_token
 
 
 # === DEPENDENCIAS DE AUTORIZACIÓN ===
+# Las dependencias que solo revisan datos en memoria son async def: FastAPI las
+# ejecuta directamente en el event loop en lugar de enviarlas al threadpool.
+# Las que consultan la base de datos siguen siendo def porque la sesión es síncrona.
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
     """
     Requerir que el usuario sea administrador
     
@@ -213,7 +500,7 @@ def require_admin(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-def require_operator_or_admin(current_user: User = Depends(get_current_user)) -> User:
+async def require_operator_or_admin(current_user: User = Depends(get_current_user)) -> User:
     """
     Requerir que el usuario sea operador o administrador
     
@@ -234,6 +521,15 @@ def require_operator_or_admin(current_user: User = Depends(get_current_user)) ->
     return current_user
 
 
+# Permisos que pueden exigirse con check_permission (propiedades de User)
+_PERMISSIONS = frozenset({
+    "can_upload",
+    "can_generate",
+    "can_manage_types",
+    "can_manage_users",
+})
+
+
 def check_permission(permission: str):
     """
     Factory para crear dependencias de permisos específicos
@@ -243,20 +539,20 @@ def check_permission(permission: str):
         
     Returns:
         function: Función de dependencia
-    """
-    def permission_checker(current_user: User = Depends(get_current_user)) -> User:
-        user_permissions = {
-            "can_upload": current_user.can_upload,
-            "can_generate": current_user.can_generate,
-            "can_manage_types": current_user.can_manage_types,
-            "can_manage_users": current_user.can_manage_users,
-        }
         
-        if not user_permissions.get(permission, False):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Permiso '{permission}' requerido"
-            )
+    Raises:
+        ValueError: Si el permiso no existe
+    """
+    if permission not in _PERMISSIONS:
+        raise ValueError(f"Permiso desconocido: {permission}")
+    
+    # Cada verificador evalúa solo la propiedad que le corresponde
+    has_permission = attrgetter(permission)
+    permission_denied = HTTPException(status.HTTP_403_FORBIDDEN, f"Permiso '{permission}' requerido")
+    
+    async def permission_checker(current_user: User = Depends(get_current_user)) -> User:
+        if not has_permission(current_user):
+            raise permission_denied.with_traceback(None)
         return current_user
     
     return permission_checker
@@ -310,15 +606,43 @@ def get_document_type_by_id(
     return document_type
 
 
+def _mark_document_viewed(document_id: int, user_id: int) -> None:
+    """
+    Registrar la visualización de un documento (se ejecuta como tarea de fondo)
+    Incremento atómico en un solo UPDATE con sesión propia
+    """
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(
+                view_count=func.coalesce(Document.view_count, 0) + 1,
+                last_viewed_at=datetime.utcnow(),
+                last_viewed_by=user_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error registrando visualización del documento {document_id}: {str(e)}")
+    finally:
+        db.close()
+
+
 def get_document_by_id(
+    background_tasks: BackgroundTasks,
     document_id: int = Path(..., description="ID del documento"),
     db: Session = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ) -> Document:
     """
     Obtener documento por ID con verificación de acceso
+    La visualización se registra después de enviar la respuesta
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_id: ID del documento
         db: Sesión de base de datos
         current_user: Usuario actual
@@ -353,9 +677,8 @@ def get_document_by_id(
             detail="Documento no encontrado"
         )
     
-    # Marcar como visto
-    document.mark_as_viewed(current_user.id)
-    db.commit()
+    # Marcar como visto fuera del camino crítico del request
+    background_tasks.add_task(_mark_document_viewed, document.id, current_user.id)
     
     return document
 
@@ -436,59 +759,72 @@ def get_user_by_id(
 
 # === DEPENDENCIAS DE PAGINACIÓN ===
 
+# Parámetros de query reutilizables: FastAPI los valida directamente como primitivos
+Page = Annotated[int, Query(ge=1, description="Número de página")]
+PageSize = Annotated[int, Query(ge=1, le=100, description="Elementos por página")]
+SortBy = Annotated[str, Query(description="Campo para ordenar")]
+SortOrder = Annotated[str, Query(regex="^(asc|desc)$", description="Orden de clasificación")]
+
+
 class PaginationParams:
     """Parámetros de paginación comunes"""
+    __slots__ = ("page", "page_size", "sort_by", "sort_order", "offset", "limit")
+    
     def __init__(
         self,
-        page: int = Query(1, ge=1, description="Número de página"),
-        page_size: int = Query(20, ge=1, le=100, description="Elementos por página"),
-        sort_by: str = Query("created_at", description="Campo para ordenar"),
-        sort_order: str = Query("desc", regex="^(asc|desc)$", description="Orden de clasificación")
+        page: int = 1,
+        page_size: int = 20,
+        sort_by: str = "created_at",
+        sort_order: str = "desc"
     ):
         self.page = page
         self.page_size = page_size
         self.sort_by = sort_by
         self.sort_order = sort_order
-        
-    @property
-    def offset(self) -> int:
-        """Calcular offset para la consulta"""
-        return (self.page - 1) * self.page_size
-    
-    @property
-    def limit(self) -> int:
-        """Límite para la consulta"""
-        return self.page_size
+        # Offset y límite para la consulta, calculados una sola vez
+        self.offset = (page - 1) * page_size
+        self.limit = page_size
 
 
-def get_pagination_params() -> PaginationParams:
-    """Dependencia para parámetros de paginación"""
-    return Depends(PaginationParams)
+async def get_pagination_params(
+    page: Page = 1,
+    page_size: PageSize = 20,
+    sort_by: SortBy = "created_at",
+    sort_order: SortOrder = "desc"
+) -> PaginationParams:
+    """
+    Dependencia para parámetros de paginación
+    Uso: pagination: PaginationParams = Depends(get_pagination_params)
+    """
+    return PaginationParams(page, page_size, sort_by, sort_order)
 
 
 # === DEPENDENCIAS DE FILTROS ===
 
 class DateRangeFilter:
     """Filtro de rango de fechas"""
-    def __init__(
-        self,
-        start_date: Optional[datetime] = Query(None, description="Fecha de inicio"),
-        end_date: Optional[datetime] = Query(None, description="Fecha de fin")
-    ):
+    __slots__ = ("start_date", "end_date")
+    
+    def __init__(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None):
         self.start_date = start_date
         self.end_date = end_date
-        
-        # Validar que start_date sea anterior a end_date
-        if self.start_date and self.end_date and self.start_date > self.end_date:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="La fecha de inicio debe ser anterior a la fecha de fin"
-            )
 
 
-def get_date_range_filter() -> DateRangeFilter:
-    """Dependencia para filtro de rango de fechas"""
-    return Depends(DateRangeFilter)
+async def get_date_range_filter(
+    start_date: Annotated[Optional[datetime], Query(description="Fecha de inicio")] = None,
+    end_date: Annotated[Optional[datetime], Query(description="Fecha de fin")] = None
+) -> DateRangeFilter:
+    """
+    Dependencia para filtro de rango de fechas
+    Uso: date_range: DateRangeFilter = Depends(get_date_range_filter)
+    """
+    # Validar que start_date sea anterior a end_date
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha de inicio debe ser anterior a la fecha de fin"
+        )
+    return DateRangeFilter(start_date, end_date)
 
 
 # === DEPENDENCIAS DE VALIDACIÓN ===
@@ -497,7 +833,11 @@ def validate_file_upload():
     """
     Validador para subida de archivos
     """
-    def validator(request: Request) -> dict:
+    # Límites calculados al crear el validador, no en cada request
+    max_size = settings.MAX_FILE_SIZE * 2  # Allowance for form data overhead
+    too_large_detail = f"Archivo demasiado grande. Máximo: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+    
+    async def validator(request: Request) -> dict:
         # Verificar Content-Type
         content_type = request.headers.get("content-type", "")
         if not content_type.startswith("multipart/form-data"):
@@ -510,11 +850,10 @@ def validate_file_upload():
         content_length = request.headers.get("content-length")
         if content_length:
             size = int(content_length)
-            max_size = settings.MAX_FILE_SIZE * 2  # Allowance for form data overhead
             if size > max_size:
                 raise HTTPException(
                     status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"Archivo demasiado grande. Máximo: {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+                    detail=too_large_detail
                 )
         
         return {"validated": True}
@@ -543,12 +882,12 @@ def get_request_logger(request: Request):
             "user_agent": request.headers.get("user-agent", "unknown"),
             "path": str(request.url.path),
             "method": request.method,
-            "timestamp": datetime.utcnow().isoformat(),
         }
         
         if details:
             log_data.update(details)
         
+        # La hora la agrega el formatter (%(asctime)s) solo si el registro se emite
         log_method = getattr(logger, level, logger.info)
         log_method(f"User action: {action}", extra=log_data)
     
@@ -557,7 +896,7 @@ def get_request_logger(request: Request):
 
 # === DEPENDENCIAS DE CACHE ===
 
-def get_cache_key(prefix: str, *args) -> str:
+def get_cache_key(prefix: str, *args) -> bytes:
     """
     Generar clave de cache
     
@@ -566,18 +905,17 @@ def get_cache_key(prefix: str, *args) -> str:
         *args: Argumentos adicionales para la clave
         
     Returns:
-        str: Clave de cache
+        bytes: Clave de cache, lista para usarse directamente en Redis
     """
-    key_parts = [prefix] + [str(arg) for arg in args]
-    return ":".join(key_parts)
+    return ":".join((prefix, *map(str, args))).encode()
 
 
 # === DEPENDENCIAS DE RATE LIMITING ===
 
 class RateLimiter:
-    """Simple rate limiter en memoria"""
+    """Simple rate limiter en memoria (ventana deslizante por clave)"""
     def __init__(self):
-        self.requests = {}
+        self.requests = defaultdict(deque)
     
     def is_allowed(self, key: str, limit: int, window: int) -> bool:
         """
@@ -591,29 +929,85 @@ class RateLimiter:
         Returns:
             bool: True si está permitida
         """
-        now = datetime.utcnow()
+        now = time.monotonic()
+        timestamps = self.requests[key]
         
-        if key not in self.requests:
-            self.requests[key] = []
+        # Descartar requests fuera de la ventana (las más antiguas están al inicio)
+        cutoff = now - window
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
         
-        # Limpiar requests antiguas
-        cutoff = now - timedelta(seconds=window)
-        self.requests[key] = [
-            req_time for req_time in self.requests[key] 
-            if req_time > cutoff
-        ]
-        
-        # Verificar límite
-        if len(self.requests[key]) >= limit:
+        # Verificar límite (la cola nunca supera `limit` elementos)
+        if len(timestamps) >= limit:
             return False
         
         # Agregar request actual
-        self.requests[key].append(now)
+        timestamps.append(now)
         return True
 
 
+class RedisRateLimiter:
+    """
+    Rate limiter compartido entre workers usando Redis
+    
+    Ventana deslizante con un sorted set por clave; limpieza, conteo e
+    inserción se ejecutan atómicamente en un script Lua (un round-trip).
+    Si Redis no responde se usa el limitador en memoria como respaldo.
+    """
+    SCRIPT = """
+    local key = KEYS[1]
+    local now = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local limit = tonumber(ARGV[3])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        return 0
+    end
+    redis.call('ZADD', key, now, ARGV[4])
+    redis.call('PEXPIRE', key, window)
+    return 1
+    """
+    
+    def __init__(self, client, fallback: RateLimiter):
+        self.client = client
+        self.fallback = fallback
+        self._script = client.register_script(self.SCRIPT)
+    
+    def is_allowed(self, key: str, limit: int, window: int) -> bool:
+        """
+        Verificar si la request está permitida
+        
+        Args:
+            key: Clave única para el rate limiting
+            limit: Número máximo de requests
+            window: Ventana de tiempo en segundos
+            
+        Returns:
+            bool: True si está permitida
+        """
+        now_ms = int(time.time() * 1000)
+        try:
+            allowed = self._script(
+                keys=[f"ratelimit:{key}"],
+                args=[now_ms, window * 1000, limit, f"{now_ms}:{uuid.uuid4().hex}"]
+            )
+            return bool(allowed)
+        except Exception as e:
+            logger.warning(f"Rate limiting con Redis no disponible: {str(e)}")
+            return self.fallback.is_allowed(key, limit, window)
+
+
+def _create_rate_limiter():
+    """Usar Redis si está configurado, si no el limitador en memoria"""
+    memory_limiter = RateLimiter()
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return memory_limiter
+    return RedisRateLimiter(redis_client, fallback=memory_limiter)
+
+
 # Instancia global del rate limiter
-rate_limiter = RateLimiter()
+rate_limiter = _create_rate_limiter()
 
 
 def create_rate_limit_dependency(limit: int, window: int = 60):
@@ -647,23 +1041,36 @@ def create_rate_limit_dependency(limit: int, window: int = 60):
 
 # === DEPENDENCIAS ESPECÍFICAS DE ENDPOINTS ===
 
-def verify_document_ownership_or_admin(
-    document: Document = Depends(get_document_by_id),
+def get_document_for_modification(
+    document_id: int = Path(..., description="ID del documento"),
+    db: Session = Depends(get_database),
     current_user: User = Depends(get_current_user)
 ) -> Document:
     """
-    Verificar que el usuario sea dueño del documento o administrador
+    Obtener documento verificando que el usuario sea dueño o administrador
+    
+    A diferencia de get_document_by_id no marca el documento como visto:
+    una sola consulta y ninguna escritura antes de autorizar la modificación.
     
     Args:
-        document: Documento a verificar
+        document_id: ID del documento
+        db: Sesión de base de datos
         current_user: Usuario actual
         
     Returns:
         Document: Documento verificado
         
     Raises:
-        HTTPException: Si no tiene permisos
+        HTTPException: Si el documento no existe o no tiene permisos
     """
+    document = db.query(Document).filter(Document.id == document_id).first()
+    
+    if not document or (document.status == "deleted" and not current_user.is_admin):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Documento no encontrado"
+        )
+    
     if not (current_user.is_admin or document.uploaded_by == current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -673,7 +1080,11 @@ def verify_document_ownership_or_admin(
     return document
 
 
-def verify_qr_ownership_or_admin(
+# Alias por compatibilidad
+verify_document_ownership_or_admin = get_document_for_modification
+
+
+async def verify_qr_ownership_or_admin(
     qr_code: QRCode = Depends(get_qr_code_by_id),
     current_user: User = Depends(get_current_user)
 ) -> QRCode:
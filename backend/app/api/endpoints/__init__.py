@@ -8,6 +8,7 @@ from .documents import router as documents_router
 from .document_types import router as document_types_router
 from .generator import router as generator_router
 from .search import router as search_router
+from .admin import router as admin_router
 
 # Lista de todos los routers disponibles
 __all__ = [
@@ -15,7 +16,8 @@ __all__ = [
     "documents_router",
     "document_types_router",
     "generator_router",
-    "search_router"
+    "search_router",
+    "admin_router"
 ]
 
 # Configuración de routers con sus prefijos y tags
@@ -49,6 +51,12 @@ ROUTER_CONFIG = {
         "prefix": "/search",
         "tags": ["Búsqueda"],
         "include_in_schema": True
+    },
+    "admin": {
+        "router": admin_router,
+        "prefix": "/admin",
+        "tags": ["Administración"],
+        "include_in_schema": True
     }
 }
 
@@ -8,7 +8,7 @@ from typing import Dict, Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
 
 from ...database import get_db
 from ...api.deps import get_current_user, require_admin
@@ -16,11 +16,17 @@ from ...models.user import User
 from ...models.document import Document
 from ...models.document_type import DocumentType
 from ...models.qr_code import QRCode
+from ...utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Las respuestas de estado y estadísticas son globales (no dependen del admin que
+# consulta) y el panel las sondea cada pocos segundos: se reutilizan por unos segundos
+ADMIN_CACHE_TTL = 15
+_admin_cache = TTLCache(maxsize=8, ttl=ADMIN_CACHE_TTL)
+
 
 @router.get("/status", summary="Estado del sistema (Admin)")
 async def get_admin_status(
@@ -31,23 +37,40 @@ async def get_admin_status(
     Obtener estado general del sistema para el panel de administración
     Requiere rol de administrador
     """
-    try:
-        # Contar usuarios activos
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-
-        # Contar documentos
-        total_documents = db.query(Document).count()
+    cached = _admin_cache.get("status")
+    if cached is not None:
+        return cached
 
-        # Contar tipos de documento
-        total_document_types = db.query(DocumentType).count()
-
-        # Contar QR codes
-        total_qr_codes = db.query(QRCode).count()
-        used_qr_codes = db.query(QRCode).filter(QRCode.is_used == True).count()
+    try:
+        # Todos los conteos en una sola consulta: un agregado por tabla con
+        # FILTER para los subconjuntos, así cada tabla se recorre una sola vez
+        user_counts = select(
+            func.count().label("total_users"),
+            func.count().filter(User.is_active == True).label("active_users"),
+        ).select_from(User).subquery()
+        document_counts = select(
+            func.count().label("total_documents"),
+        ).select_from(Document).subquery()
+        document_type_counts = select(
+            func.count().label("total_document_types"),
+        ).select_from(DocumentType).subquery()
+        qr_counts = select(
+            func.count().label("total_qr_codes"),
+            func.count().filter(QRCode.is_used == True).label("used_qr_codes"),
+        ).select_from(QRCode).subquery()
+
+        counts = db.execute(
+            select(user_counts, document_counts, document_type_counts, qr_counts)
+        ).one()
+        total_users = counts.total_users
+        active_users = counts.active_users
+        total_documents = counts.total_documents
+        total_document_types = counts.total_document_types
+        total_qr_codes = counts.total_qr_codes
+        used_qr_codes = counts.used_qr_codes
 
         # Estado general
-        return {
+        result = {
             "status": "operational",
             "timestamp": datetime.utcnow().isoformat(),
             "system": {
@@ -74,6 +97,8 @@ async def get_admin_status(
                 }
             }
         }
+        _admin_cache.set("status", result)
+        return result
 
     except Exception as e:
         logger.error(f"Error obteniendo estado del sistema: {str(e)}")
@@ -92,6 +117,10 @@ async def get_admin_stats(
     Obtener estadísticas detalladas del sistema
     Requiere rol de administrador
     """
+    cached = _admin_cache.get("stats")
+    if cached is not None:
+        return cached
+
     try:
         # Estadísticas de documentos por mes (últimos 6 meses)
         six_months_ago = datetime.utcnow() - timedelta(days=180)
@@ -132,7 +161,7 @@ async def get_admin_stats(
             User.created_at >= thirty_days_ago
         ).count()
 
-        return {
+        result = {
             "timestamp": datetime.utcnow().isoformat(),
             "period": {
                 "start": six_months_ago.isoformat(),
@@ -166,6 +195,8 @@ async def get_admin_stats(
                 "recent_30_days": recent_users
             }
         }
+        _admin_cache.set("stats", result)
+        return result
 
     except Exception as e:
         logger.error(f"Error obteniendo estadísticas del sistema: {str(e)}")
@@ -2,18 +2,28 @@
 Endpoints de autenticación con Microsoft 365
 Manejo de login, logout y gestión de tokens JWT
 """
+import asyncio
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from typing import Dict, Any, Optional
-from urllib.parse import urlencode
+from urllib.parse import quote_plus, urlencode
+from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request, Response
 from fastapi.responses import RedirectResponse, JSONResponse
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from jose import jwt
+import jwt
+from jwt.algorithms import get_default_algorithms
 import httpx
+import bcrypt
+from pydantic_core import from_json
 
-from ...database import get_db
+from ...database import get_db, SessionLocal
 from ...config import get_settings
 from ...models.user import User, UserRole, UserStatus
 from ...schemas.user import (
@@ -23,7 +33,15 @@ from ...schemas.user import (
     UserCreate,
     UserLocalLogin
 )
-from ..deps import get_current_user, get_current_user_optional, get_request_logger
+from ...utils.http_client import get_http_client
+from ..deps import (
+    get_current_user,
+    get_current_user_optional,
+    get_request_logger,
+    invalidate_user_cache,
+    get_cached_user_response,
+    set_cached_user_response
+)
 
 # Configuración
 settings = get_settings()
@@ -32,6 +50,39 @@ logger = logging.getLogger(__name__)
 # Router
 router = APIRouter()
 
+# URL de autorización de Microsoft sin el parámetro state (constante por proceso)
+_MICROSOFT_AUTH_URL_PREFIX = (
+    f"https://login.microsoftonline.com/{settings.MICROSOFT_TENANT_ID}/oauth2/v2.0/authorize?"
+    + urlencode({
+        "client_id": settings.MICROSOFT_CLIENT_ID,
+        "response_type": "code",
+        "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
+        "scope": " ".join(settings.MICROSOFT_SCOPES),
+        "response_mode": "query",
+    })
+    + "&state="  # Usar para redirigir después del login
+)
+
+# Intercambio de código por tokens y perfil en Graph: solo varían el código y
+# el token de acceso, el resto se arma una sola vez por proceso
+_MICROSOFT_TOKEN_URL = f"https://login.microsoftonline.com/{settings.MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
+_MICROSOFT_GRAPH_ME_URL = "https://graph.microsoft.com/v1.0/me"
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+_BASE_TOKEN_DATA = {
+    "client_id": settings.MICROSOFT_CLIENT_ID,
+    "client_secret": settings.MICROSOFT_CLIENT_SECRET,
+    "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
+    "grant_type": "authorization_code"
+}
+
+# Firma JWT: la clave se prepara una sola vez
+_JWT_SIGNING_KEY = get_default_algorithms()[settings.ALGORITHM].prepare_key(settings.SECRET_KEY)
+_JWT_EXPIRE_SECONDS = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+# Hash bcrypt (mismo costo que User.set_password) para igualar el tiempo de
+# respuesta de los logins locales con email inexistente
+_DUMMY_PASSWORD_HASH = bcrypt.hashpw(b"sgd-web-dummy-password", bcrypt.gensalt()).decode('utf-8')
+
 
 # === ENDPOINTS DE AUTENTICACIÓN ===
 
@@ -52,30 +103,15 @@ async def microsoft_login(
         RedirectResponse: Redirección a Microsoft login
     """
     try:
-        # Construir URL de autorización de Microsoft
-        auth_params = {
-            "client_id": settings.MICROSOFT_CLIENT_ID,
-            "response_type": "code",
-            "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
-            "scope": " ".join(settings.MICROSOFT_SCOPES),
-            "response_mode": "query",
-            "state": redirect_uri or "default"  # Usar para redirigir después del login
-        }
+        # Solo el state varía por request; el resto de la URL está precalculado
+        auth_url = _MICROSOFT_AUTH_URL_PREFIX + quote_plus(redirect_uri or "default")
         
-        # URL base de Microsoft para autenticación
-        microsoft_auth_url = (
-            f"https://login.microsoftonline.com/{settings.MICROSOFT_TENANT_ID}/oauth2/v2.0/authorize"
-        )
-        
-        # Construir URL completa
-        auth_url = f"{microsoft_auth_url}?{urlencode(auth_params)}"
-        
-        logger.info(f"Redirigiendo usuario a Microsoft login desde IP: {request.client.host}")
+        logger.info("Redirigiendo usuario a Microsoft login desde IP: %s", request.client.host)
         
         return RedirectResponse(url=auth_url)
         
     except Exception as e:
-        logger.error(f"Error generando URL de Microsoft login: {str(e)}")
+        logger.error("Error generando URL de Microsoft login: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al iniciar proceso de autenticación"
@@ -85,6 +121,7 @@ async def microsoft_login(
 @router.get("/microsoft/callback")
 async def microsoft_callback(
     request: Request,
+    background_tasks: BackgroundTasks,
     code: Optional[str] = None,
     error: Optional[str] = None,
     error_description: Optional[str] = None,
@@ -98,6 +135,7 @@ async def microsoft_callback(
     
     Args:
         request: Request object de FastAPI
+        background_tasks: Tareas a ejecutar después de la respuesta
         code: Código de autorización de Microsoft
         error: Error de Microsoft (si lo hay)
         error_description: Descripción del error
@@ -111,7 +149,7 @@ async def microsoft_callback(
     try:
         # Verificar si hubo error en Microsoft
         if error:
-            logger.warning(f"Error de Microsoft: {error} - {error_description}")
+            logger.warning("Error de Microsoft: %s - %s", error, error_description)
             log_action("microsoft_auth_error", {"error": error, "description": error_description})
             
             # Redirigir al frontend con error
@@ -146,11 +184,10 @@ async def microsoft_callback(
             "method": "microsoft_365"
         })
         
-        # Actualizar último login del usuario
-        user.update_last_login()
-        db.commit()
+        # Actualizar último login después de responder
+        background_tasks.add_task(persist_last_login, user.id)
         
-        logger.info(f"Login exitoso para usuario: {user.email}")
+        logger.info("Login exitoso para usuario: %s", user.email)
         
         # Redirigir al frontend con token
         frontend_url = settings.BACKEND_CORS_ORIGINS[0] if settings.BACKEND_CORS_ORIGINS else "/"
@@ -167,7 +204,7 @@ async def microsoft_callback(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error en callback de Microsoft: {str(e)}")
+        logger.error("Error en callback de Microsoft: %s", e)
         log_action("microsoft_callback_error", {"error": str(e)}, "error")
         
         # Redirigir con error genérico
@@ -179,6 +216,7 @@ async def microsoft_callback(
 @router.post("/local/login", response_model=UserLoginResponse)
 async def login_local(
     credentials: UserLocalLogin,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     log_action = Depends(get_request_logger)
 ):
@@ -187,6 +225,7 @@ async def login_local(
 
     Args:
         credentials: Email y contraseña del usuario
+        background_tasks: Tareas a ejecutar después de la respuesta
         db: Sesión de base de datos
         log_action: Logger de acciones
 
@@ -201,14 +240,24 @@ async def login_local(
                 detail="Autenticación local no habilitada"
             )
 
-        # Buscar usuario por email
-        user = db.query(User).filter(
-            User.email == credentials.email.lower(),
-            User.is_local_user == True
+        # Buscar solo las columnas necesarias para validar credenciales; la
+        # entidad completa se carga únicamente si el login es exitoso. El email
+        # solo es único entre usuarios activos: se prefiere la fila activa
+        account = db.execute(
+            select(User.id, User.password_hash, User.is_active, User.status).where(
+                User.email == credentials.email.lower(),
+                User.is_local_user == True
+            ).order_by(User.is_active.desc(), User.id.desc())
         ).first()
 
-        if not user or not user.verify_password(credentials.password):
-            logger.warning(f"Intento de login fallido para: {credentials.email}")
+        # bcrypt es CPU puro: se ejecuta en el threadpool para no bloquear el
+        # event loop. Sin cuenta (o sin hash) se verifica contra un hash ficticio
+        # para que el tiempo de respuesta no revele si el email existe.
+        password_hash = (account.password_hash if account else None) or _DUMMY_PASSWORD_HASH
+        password_ok = await asyncio.to_thread(User.check_password, credentials.password, password_hash)
+
+        if not account or not account.password_hash or not password_ok:
+            logger.warning("Intento de login fallido para: %s", credentials.email)
             log_action("failed_local_login", {"email": credentials.email}, "warning")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -216,13 +265,15 @@ async def login_local(
             )
 
         # Verificar que el usuario esté activo
-        if not user.is_active or user.status == UserStatus.SUSPENDED:
-            logger.warning(f"Intento de login de usuario inactivo: {credentials.email}")
+        if not account.is_active or account.status == UserStatus.SUSPENDED:
+            logger.warning("Intento de login de usuario inactivo: %s", credentials.email)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario inactivo o suspendido"
             )
 
+        user = db.get(User, account.id)
+
         # Generar JWT
         access_token = create_access_token({"sub": user.id})
 
@@ -232,14 +283,13 @@ async def login_local(
             "email": user.email
         })
 
-        # Actualizar último login
-        user.update_last_login()
-        db.commit()
+        # Actualizar último login después de responder
+        background_tasks.add_task(persist_last_login, user.id)
 
-        logger.info(f"Login local exitoso para usuario: {user.email}")
+        logger.info("Login local exitoso para usuario: %s", user.email)
 
         return UserLoginResponse(
-            user=UserSchema.from_orm(user),
+            user=UserSchema.model_validate(user),
             access_token=access_token,
             token_type="bearer",
             expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -248,7 +298,7 @@ async def login_local(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error en login local: {str(e)}")
+        logger.error("Error en login local: %s", e)
         log_action("local_login_error", {"error": str(e)}, "error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -259,6 +309,7 @@ async def login_local(
 @router.post("/token", response_model=UserLoginResponse)
 async def login_with_microsoft_token(
     microsoft_token: str,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     log_action = Depends(get_request_logger)
 ):
@@ -267,6 +318,7 @@ async def login_with_microsoft_token(
     
     Args:
         microsoft_token: Token de acceso de Microsoft Graph
+        background_tasks: Tareas a ejecutar después de la respuesta
         db: Sesión de base de datos
         log_action: Logger de acciones
         
@@ -289,12 +341,11 @@ async def login_with_microsoft_token(
             "email": user.email
         })
         
-        # Actualizar último login
-        user.update_last_login()
-        db.commit()
+        # Actualizar último login después de responder
+        background_tasks.add_task(persist_last_login, user.id)
         
         return UserLoginResponse(
-            user=UserSchema.from_orm(user),
+            user=UserSchema.model_validate(user),
             access_token=access_token,
             token_type="bearer",
             expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
@@ -303,7 +354,7 @@ async def login_with_microsoft_token(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error en login con token: {str(e)}")
+        logger.error("Error en login con token: %s", e)
         log_action("token_login_error", {"error": str(e)}, "error")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -311,8 +362,12 @@ async def login_with_microsoft_token(
         )
 
 
+# logout, /me y /status usan el cliente Redis síncrono y pueden cargar columnas
+# del usuario con la sesión síncrona: se declaran con def para que FastAPI los
+# ejecute en su threadpool y no bloqueen el event loop.
+
 @router.post("/logout")
-async def logout(
+def logout(
     current_user: User = Depends(get_current_user),
     log_action = Depends(get_request_logger)
 ):
@@ -327,13 +382,16 @@ async def logout(
         dict: Confirmación de logout
     """
     try:
+        # Descartar el usuario cacheado (local y Redis)
+        invalidate_user_cache(current_user.id)
+        
         # Log de logout
         log_action("logout", {
             "user_id": current_user.id,
             "email": current_user.email
         })
         
-        logger.info(f"Logout exitoso para usuario: {current_user.email}")
+        logger.info("Logout exitoso para usuario: %s", current_user.email)
         
         return {
             "message": "Logout exitoso",
@@ -341,7 +399,7 @@ async def logout(
         }
         
     except Exception as e:
-        logger.error(f"Error en logout: {str(e)}")
+        logger.error("Error en logout: %s", e)
         log_action("logout_error", {"error": str(e)}, "error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -350,19 +408,26 @@ async def logout(
 
 
 @router.get("/me", response_model=UserSchema)
-async def get_current_user_info(
+def get_current_user_info(
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtener información del usuario actual
     
     Args:
+        request: Request object de FastAPI
         current_user: Usuario actual autenticado
         
     Returns:
         UserSchema: Información completa del usuario
     """
-    return UserSchema.from_orm(current_user)
+    body = get_cached_user_response("me", current_user.id)
+    if body is None:
+        body = UserSchema.model_validate(current_user).model_dump_json().encode()
+        set_cached_user_response("me", current_user.id, body)
+    
+    return _cacheable_json_response(request, body)
 
 
 @router.post("/refresh")
@@ -397,7 +462,7 @@ async def refresh_token(
         }
         
     except Exception as e:
-        logger.error(f"Error renovando token: {str(e)}")
+        logger.error("Error renovando token: %s", e)
         log_action("token_refresh_error", {"error": str(e)}, "error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -406,35 +471,26 @@ async def refresh_token(
 
 
 @router.get("/status")
-async def auth_status(
+def auth_status(
+    request: Request,
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """
     Verificar estado de autenticación
     
     Args:
+        request: Request object de FastAPI
         current_user: Usuario actual (opcional)
         
     Returns:
         dict: Estado de autenticación
     """
     if current_user:
-        return {
-            "authenticated": True,
-            "user": {
-                "id": current_user.id,
-                "email": current_user.email,
-                "name": current_user.full_name,
-                "role": current_user.role.value,
-                "status": current_user.status.value
-            },
-            "permissions": {
-                "can_upload": current_user.can_upload,
-                "can_generate": current_user.can_generate,
-                "can_manage_types": current_user.can_manage_types,
-                "can_manage_users": current_user.can_manage_users
-            }
-        }
+        body = get_cached_user_response("status", current_user.id)
+        if body is None:
+            body = json.dumps(_build_auth_status(current_user)).encode()
+            set_cached_user_response("status", current_user.id, body)
+        return _cacheable_json_response(request, body)
     else:
         return {
             "authenticated": False,
@@ -443,6 +499,46 @@ async def auth_status(
         }
 
 
+def _build_auth_status(current_user: User) -> Dict[str, Any]:
+    """Estado de autenticación de un usuario autenticado"""
+    return {
+        "authenticated": True,
+        "user": {
+            "id": current_user.id,
+            "email": current_user.email,
+            "name": current_user.full_name,
+            "role": current_user.role.value,
+            "status": current_user.status.value
+        },
+        "permissions": {
+            "can_upload": current_user.can_upload,
+            "can_generate": current_user.can_generate,
+            "can_manage_types": current_user.can_manage_types,
+            "can_manage_users": current_user.can_manage_users
+        }
+    }
+
+
+def _cacheable_json_response(request: Request, body: bytes) -> Response:
+    """
+    Respuesta JSON privada con ETag: si el cliente ya tiene esta versión
+    (If-None-Match) se responde 304 sin cuerpo
+    
+    no-cache obliga al navegador a revalidar en cada petición (la respuesta
+    depende del token, no solo de la URL), así que tras un logout o un cambio
+    de usuario nunca se sirve la respuesta del usuario anterior.
+    """
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 # === FUNCIONES AUXILIARES ===
 
 async def exchange_code_for_tokens(code: str) -> Dict[str, Any]:
@@ -459,36 +555,27 @@ async def exchange_code_for_tokens(code: str) -> Dict[str, Any]:
         HTTPException: Si el intercambio falla
     """
     try:
-        token_url = f"https://login.microsoftonline.com/{settings.MICROSOFT_TENANT_ID}/oauth2/v2.0/token"
-        
-        token_data = {
-            "client_id": settings.MICROSOFT_CLIENT_ID,
-            "client_secret": settings.MICROSOFT_CLIENT_SECRET,
-            "code": code,
-            "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
-            "grant_type": "authorization_code"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                token_url,
-                data=token_data,
-                headers={"Content-Type": "application/x-www-form-urlencoded"}
-            )
+        client = await get_http_client()
+        response = await client.post(
+            _MICROSOFT_TOKEN_URL,
+            data={**_BASE_TOKEN_DATA, "code": code},
+            headers=_FORM_HEADERS
+        )
         
         if response.status_code != 200:
-            logger.error(f"Error obteniendo tokens de Microsoft: {response.status_code} - {response.text}")
+            logger.error("Error obteniendo tokens de Microsoft: %s - %s", response.status_code, response.text)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Error al obtener tokens de Microsoft"
             )
         
-        tokens = response.json()
+        # Parser JSON nativo de pydantic-core directamente sobre los bytes
+        tokens = from_json(response.content)
         logger.info("Tokens de Microsoft obtenidos exitosamente")
         return tokens
         
     except httpx.RequestError as e:
-        logger.error(f"Error de red al obtener tokens: {str(e)}")
+        logger.error("Error de red al obtener tokens: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Error de conexión con Microsoft"
@@ -509,33 +596,27 @@ async def get_user_info_from_microsoft(access_token: str) -> UserMicrosoftData:
         HTTPException: Si la consulta falla
     """
     try:
-        graph_url = "https://graph.microsoft.com/v1.0/me"
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(graph_url, headers=headers)
+        client = await get_http_client()
+        response = await client.get(
+            _MICROSOFT_GRAPH_ME_URL,
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
         
         if response.status_code != 200:
-            logger.error(f"Error obteniendo info de usuario de Microsoft: {response.status_code}")
+            logger.error("Error obteniendo info de usuario de Microsoft: %s", response.status_code)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Error al obtener información del usuario"
             )
         
-        user_data = response.json()
-        
-        # Validar y parsear datos del usuario
-        microsoft_user = UserMicrosoftData(**user_data)
+        # Parsear y validar datos del usuario en una sola pasada (pydantic-core)
+        microsoft_user = UserMicrosoftData.model_validate_json(response.content)
         
-        logger.info(f"Información de usuario obtenida: {microsoft_user.userPrincipalName}")
+        logger.info("Información de usuario obtenida: %s", microsoft_user.userPrincipalName)
         return microsoft_user
         
     except httpx.RequestError as e:
-        logger.error(f"Error de red al obtener info de usuario: {str(e)}")
+        logger.error("Error de red al obtener info de usuario: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Error de conexión con Microsoft Graph"
@@ -546,6 +627,31 @@ async def create_or_update_user(user_info: UserMicrosoftData, db: Session) -> Us
     """
     Crear o actualizar usuario en la base de datos local
     
+    La sesión es síncrona (psycopg2): las consultas y el commit se ejecutan en
+    un hilo del pool para no bloquear el event loop mientras se espera a
+    PostgreSQL. La sesión solo se usa desde un hilo a la vez.
+    
+    Args:
+        user_info: Información del usuario desde Microsoft
+        db: Sesión de base de datos
+        
+    Returns:
+        User: Usuario creado o actualizado
+        
+    Raises:
+        HTTPException: Si hay errores de validación o dominio
+    """
+    return await asyncio.to_thread(_create_or_update_user_sync, user_info, db)
+
+
+def _create_or_update_user_sync(user_info: UserMicrosoftData, db: Session) -> User:
+    """
+    Implementación síncrona de create_or_update_user
+    
+    En el caso habitual (usuario existente sin cambios en Microsoft) cuesta una
+    sola consulta por índice único y ninguna escritura: el último login lo
+    registra persist_last_login después de la respuesta.
+    
     Args:
         user_info: Información del usuario desde Microsoft
         db: Sesión de base de datos
@@ -563,58 +669,52 @@ async def create_or_update_user(user_info: UserMicrosoftData, db: Session) -> Us
         # Validar dominio si está configurado
         if settings.ALLOWED_DOMAINS:
             domain = email.split('@')[1].lower()
-            if domain not in [d.lower() for d in settings.ALLOWED_DOMAINS]:
-                logger.warning(f"Intento de login desde dominio no permitido: {domain}")
+            if domain not in settings.ALLOWED_DOMAINS_SET:
+                logger.warning("Intento de login desde dominio no permitido: %s", domain)
                 raise HTTPException(
                     status_code=status.HTTP_403_FORBIDDEN,
                     detail="Dominio de email no permitido"
                 )
         
-        # Buscar usuario existente
-        user = db.query(User).filter(
-            (User.azure_id == user_info.id) | (User.email == email)
-        ).first()
+        user = _find_microsoft_user(db, user_info.id, email)
+        
+        if user is None:
+            user = _insert_microsoft_user(db, user_info, email)
+            if user is not None:
+                invalidate_user_cache(user.id)
+                return user
+            # Otro login concurrente creó el usuario primero: se actualiza el suyo
+            user = _find_microsoft_user(db, user_info.id, email)
+            if user is None:
+                # El conflicto fue con otro índice único (no azure_id ni email)
+                logger.error(
+                    "No se pudo crear ni encontrar el usuario de Microsoft %s (%s)",
+                    user_info.id, email
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="No se pudo registrar el usuario: conflicto con un usuario existente"
+                )
         
-        if user:
-            # Actualizar usuario existente con datos de Microsoft
-            user.update_from_microsoft(user_info.dict())
-            logger.info(f"Usuario actualizado: {email}")
-        else:
-            # Crear nuevo usuario
-            # Determinar rol inicial
-            initial_role = UserRole.ADMIN if email.lower() in [
-                admin_email.lower() for admin_email in settings.ADMIN_EMAILS
-            ] else UserRole.VIEWER
-            
-            user_create_data = UserCreate(
-                azure_id=user_info.id,
-                email=email,
-                name=user_info.displayName,
-                given_name=user_info.givenName,
-                surname=user_info.surname,
-                display_name=user_info.displayName,
-                department=user_info.department,
-                job_title=user_info.jobTitle,
-                office_location=user_info.officeLocation,
-                company_name=user_info.companyName,
-                phone=user_info.businessPhones[0] if user_info.businessPhones else None,
-                mobile_phone=user_info.mobilePhone,
-                role=initial_role
-            )
-            
-            user = User(**user_create_data.dict())
-            db.add(user)
-            logger.info(f"Usuario creado: {email} con rol {initial_role.value}")
+        # Actualizar usuario existente con datos de Microsoft
+        user.update_from_microsoft(user_info.model_dump())
+        
+        # Caso habitual: los datos de Microsoft no cambiaron desde el último
+        # login. Sin cambios netos no hay UPDATE, commit ni refresh.
+        if not db.is_modified(user):
+            return user
+        logger.info("Usuario actualizado: %s", email)
         
         db.commit()
         db.refresh(user)
+        invalidate_user_cache(user.id)
         
         return user
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error creando/actualizando usuario: {str(e)}")
+        logger.error("Error creando/actualizando usuario: %s", e)
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -622,6 +722,108 @@ async def create_or_update_user(user_info: UserMicrosoftData, db: Session) -> Us
         )
 
 
+def _find_microsoft_user(db: Session, azure_id: str, email: str) -> Optional[User]:
+    """
+    Buscar usuario existente: primero por azure_id (caso habitual en cada login)
+    y solo si no existe por email. El email solo es único entre usuarios
+    activos, así que puede haber varias filas: se prefiere la activa y, entre
+    inactivas, la más reciente.
+    """
+    return (
+        db.query(User).filter(User.azure_id == azure_id).first()
+        or db.query(User)
+        .filter(User.email == email)
+        .order_by(User.is_active.desc(), User.id.desc())
+        .first()
+    )
+
+
+def _insert_microsoft_user(db: Session, user_info: UserMicrosoftData, email: str) -> Optional[User]:
+    """
+    Crear usuario nuevo con INSERT ... ON CONFLICT DO NOTHING
+    
+    Dos callbacks concurrentes del mismo usuario nuevo ya no fallan por la
+    restricción única de azure_id/email: el que pierde no inserta nada.
+    
+    Args:
+        db: Sesión de base de datos
+        user_info: Información del usuario desde Microsoft
+        email: Email principal del usuario
+        
+    Returns:
+        Optional[User]: Usuario creado, o None si ya existía
+    """
+    # Determinar rol inicial
+    initial_role = UserRole.ADMIN if email.lower() in settings.ADMIN_EMAILS_SET else UserRole.VIEWER
+    
+    user_create_data = UserCreate(
+        azure_id=user_info.id,
+        email=email,
+        name=user_info.displayName,
+        given_name=user_info.givenName,
+        surname=user_info.surname,
+        display_name=user_info.displayName,
+        department=user_info.department,
+        job_title=user_info.jobTitle,
+        office_location=user_info.officeLocation,
+        company_name=user_info.companyName,
+        phone=user_info.businessPhones[0] if user_info.businessPhones else None,
+        mobile_phone=user_info.mobilePhone,
+        role=initial_role
+    )
+    
+    # UserCreate valida una vez (azure_id, email, teléfonos); un solo volcado al INSERT
+    user_id = db.execute(
+        pg_insert(User)
+        .values(**user_create_data.model_dump())
+        .on_conflict_do_nothing()
+        .returning(User.id)
+    ).scalar_one_or_none()
+    db.commit()
+    
+    if user_id is None:
+        return None
+    
+    logger.info("Usuario creado: %s con rol %s", email, initial_role.value)
+    return db.get(User, user_id)
+
+
+def persist_last_login(user_id: int) -> None:
+    """
+    Registrar el login de un usuario (se ejecuta como tarea de fondo)
+    Equivale a User.update_last_login() en un solo UPDATE atómico
+    
+    Args:
+        user_id: ID del usuario
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                status=case(
+                    (User.first_login.is_(None), literal(UserStatus.ACTIVE, User.status.type)),
+                    else_=User.status
+                ),
+                first_login=func.coalesce(User.first_login, now),
+                last_login=now,
+                last_activity=now,
+                login_count=func.coalesce(User.login_count, 0) + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        # El primer login cambia el estado del usuario
+        invalidate_user_cache(user_id)
+    except Exception as e:
+        db.rollback()
+        logger.error("Error registrando último login del usuario %s: %s", user_id, e)
+    finally:
+        db.close()
+
+
 def create_access_token(data: dict) -> str:
     """
     Crear token JWT de acceso
@@ -638,16 +840,11 @@ def create_access_token(data: dict) -> str:
     if 'sub' in to_encode:
         to_encode['sub'] = str(to_encode['sub'])
 
-    expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
-
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    # NumericDate en segundos enteros, como exige el estándar
+    now = int(time.time())
+    to_encode.update({"exp": now + _JWT_EXPIRE_SECONDS, "iat": now, "jti": uuid4().hex})
 
-    return encoded_jwt
+    return jwt.encode(to_encode, _JWT_SIGNING_KEY, algorithm=settings.ALGORITHM)
 
 
 # === ENDPOINTS ADMINISTRATIVOS ===
@@ -689,7 +886,7 @@ async def sync_users_with_microsoft(
         }
         
     except Exception as e:
-        logger.error(f"Error en sincronización de usuarios: {str(e)}")
+        logger.error("Error en sincronización de usuarios: %s", e)
         log_action("user_sync_error", {"error": str(e)}, "error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
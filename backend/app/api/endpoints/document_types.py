@@ -3,18 +3,27 @@
 Endpoints para gestión de tipos de documento
 CRUD completo y operaciones administrativas
 """
+import base64
+import csv
+import hashlib
+import io
+import json
 import logging
-import os
 import shutil
-from typing import List, Optional
+from pathlib import Path
+from stat import S_ISREG
+from typing import List, Optional, Tuple
 from datetime import datetime
+from urllib.parse import quote
 
+import orjson
 from fastapi import (
-    APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
+    APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, UploadFile,
+    File, Form, Response
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, delete, exists, func, select, tuple_, text, update, DateTime
 
 from ...database import get_db
 from ...config import get_settings
@@ -22,9 +31,9 @@ from ...models.user import User
 from ...models.document_type import DocumentType
 from ...models.document import Document
 from ...models.qr_code import QRCode
+from ...utils.cache import TTLCache, get_redis_client
 from ...schemas.document_type import (
     DocumentType as DocumentTypeSchema,
-    DocumentTypeSummary,
     DocumentTypeCreate,
     DocumentTypeUpdate,
     DocumentTypeAdminUpdate,
@@ -35,6 +44,9 @@ from ...schemas.document_type import (
     DocumentTypeClone,
     DocumentTypeBulkAction,
     DocumentTypeBulkActionResponse,
+    DocumentTypeBatchRequest,
+    DocumentTypeBatchItemResult,
+    DocumentTypeBatchResponse,
     DocumentTypeTemplate,
     DocumentTypeExport
 )
@@ -44,6 +56,7 @@ from ..deps import (
     require_manage_types_permission,
     get_document_type_by_id,
     PaginationParams,
+    get_pagination_params,
     get_request_logger,
     create_rate_limit_dependency
 )
@@ -58,11 +71,294 @@ router = APIRouter()
 # Rate limiting para operaciones sensibles
 admin_rate_limit = create_rate_limit_dependency(limit=30, window=60)
 
+# Columnas por las que se puede ordenar el listado (sort_by -> expresión).
+# documents_count y sort_order admiten NULL: se ordena por COALESCE(col, 0)
+# (su valor por defecto) porque en el cursor (NULL, id) ninguna comparación
+# de tuplas es verdadera. Los índices de keyset usan la misma expresión.
+SORT_COLUMNS = {
+    "name": DocumentType.name,
+    "code": DocumentType.code,
+    "created_at": DocumentType.created_at,
+    "updated_at": DocumentType.updated_at,
+    "documents_count": func.coalesce(DocumentType.documents_count, 0),
+    "sort_order": func.coalesce(DocumentType.sort_order, 0),
+}
+
+# Columnas de DocumentTypeSummary; el listado las lee como tuplas y arma los
+# dicts con estas claves (can_generate se calcula a partir de template_path)
+SUMMARY_COLUMNS = (
+    DocumentType.id,
+    DocumentType.code,
+    DocumentType.name,
+    DocumentType.description,
+    DocumentType.is_active,
+    DocumentType.requires_qr,
+    DocumentType.documents_count,
+    DocumentType.color,
+    DocumentType.icon,
+)
+SUMMARY_KEYS = tuple(column.key for column in SUMMARY_COLUMNS)
+
+# Grupos de configuración de los esquemas y sus campos, que se llaman igual
+# que las columnas del modelo
+FIELD_GROUPS = {
+    "requirements": (
+        "requires_qr", "requires_cedula", "requires_nombre",
+        "requires_telefono", "requires_email", "requires_direccion",
+    ),
+    "file_config": ("allowed_file_types", "max_file_size_mb", "allow_multiple_files"),
+    "ui_config": ("color", "icon", "sort_order"),
+    "workflow": (
+        "requires_approval", "auto_notify_email", "notification_emails",
+        "retention_days", "auto_archive",
+    ),
+    "qr_config": ("qr_table_number", "qr_row", "qr_column", "qr_width", "qr_height"),
+}
+
+# Columnas de la exportación (las de DocumentTypeExport, en su orden)
+EXPORT_KEYS = tuple(DocumentTypeExport.model_fields)
+EXPORT_COLUMNS = tuple(getattr(DocumentType, name) for name in EXPORT_KEYS)
+# Filas que se traen de la base de datos (y se escriben al CSV) por bloque
+EXPORT_YIELD_PER = 500
+
+# Estadísticas (/stats): globales, sin depender del usuario, y el top de tipos
+# más usados recorre la tabla de documentos; se reutilizan por un minuto
+STATS_CACHE_TTL = 60
+_stats_cache = TTLCache(maxsize=1, ttl=STATS_CACHE_TTL)
+
+# Directorio de plantillas, resuelto una sola vez al importar el módulo
+TEMPLATES_DIR = Path(settings.TEMPLATES_PATH)
+
+# Tamaño de bloque al copiar plantillas subidas a disco
+TEMPLATE_CHUNK_SIZE = 64 * 1024
+# Firma de archivo ZIP con que empieza todo .docx
+DOCX_SIGNATURE = b"PK\x03\x04"
+TEMPLATE_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Totales del listado (solo con include_total=true), por combinación de filtros.
+# Un total puede quedar desactualizado hasta LIST_TOTAL_TTL segundos.
+LIST_TOTAL_TTL = 45
+_list_total_cache = TTLCache(maxsize=256, ttl=LIST_TOTAL_TTL)
+
+# Sin filtros se usa la estimación de pg_class a partir de este tamaño
+LIST_TOTAL_ESTIMATE_MIN_ROWS = 10_000
+
+# Búsqueda por código (se consulta en cada carga/validación de documentos).
+# El cache local vive poco porque la invalidación solo alcanza a este proceso;
+# Redis (compartido entre workers) lo mantiene más tiempo.
+CODE_CACHE_TTL = 30
+CODE_REDIS_TTL = 300
+_code_cache = TTLCache(maxsize=512, ttl=CODE_CACHE_TTL)
+
+
+def _document_type_response(
+    document_type: DocumentType,
+    status_code: int = status.HTTP_200_OK
+) -> ORJSONResponse:
+    """
+    Serializar un tipo de documento completo con orjson
+    
+    El esquema se valida una sola vez aquí; al devolver un Response FastAPI
+    omite la segunda validación y jsonable_encoder de response_model.
+    
+    Args:
+        document_type: Tipo de documento
+        status_code: Código HTTP de la respuesta
+        
+    Returns:
+        ORJSONResponse: Respuesta JSON
+    """
+    return ORJSONResponse(
+        DocumentTypeSchema.model_validate(document_type).model_dump(),
+        status_code=status_code
+    )
+
+
+def invalidate_document_type_code_cache(*codes: str) -> None:
+    """
+    Descartar las respuestas cacheadas de get_document_type_by_code
+    
+    Args:
+        codes: Códigos de los tipos modificados
+    """
+    for code in codes:
+        _code_cache.pop(code)
+    
+    client = get_redis_client()
+    if client is not None and codes:
+        try:
+            client.delete(*(f"dt:code:{code}" for code in codes))
+        except Exception as e:
+            logger.warning(f"Error invalidando tipos de documento en Redis: {str(e)}")
+
+
+def _get_cached_document_type_by_code(code: str) -> Optional[dict]:
+    """Obtener la respuesta serializada de un tipo por código (local y Redis)"""
+    cached = _code_cache.get(code)
+    if cached is not None:
+        return cached
+    
+    client = get_redis_client()
+    if client is not None:
+        try:
+            raw = client.get(f"dt:code:{code}")
+        except Exception as e:
+            logger.warning(f"Error leyendo tipo de documento desde Redis: {str(e)}")
+            return None
+        if raw is not None:
+            cached = orjson.loads(raw)
+            _code_cache.set(code, cached)
+            return cached
+    return None
+
+
+def _set_cached_document_type_by_code(code: str, data: dict) -> None:
+    """Guardar la respuesta serializada de un tipo por código"""
+    _code_cache.set(code, data)
+    
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.set(f"dt:code:{code}", orjson.dumps(data), ex=CODE_REDIS_TTL)
+        except Exception as e:
+            logger.warning(f"Error guardando tipo de documento en Redis: {str(e)}")
+
+
+def _document_type_column_values(data: dict) -> dict:
+    """
+    Convertir los datos de un esquema de tipo de documento en columnas
+    
+    Los grupos de FIELD_GROUPS se aplanan en sus columnas y las listas que se
+    guardan en columnas Text se serializan como JSON. Los campos sueltos en
+    None se ignoran. Lo usan tanto la creación como la actualización.
+    
+    Args:
+        data: Datos del esquema (model_dump)
+        
+    Returns:
+        dict: Columna -> valor
+    """
+    values = {}
+    for key, value in data.items():
+        if key in FIELD_GROUPS:
+            if value is not None:
+                values.update(value)
+        elif value is not None:
+            values[key] = value
+    
+    # Columnas Text que guardan listas como JSON
+    for key in ("allowed_file_types", "notification_emails"):
+        if values.get(key) is not None:
+            values[key] = json.dumps(values[key])
+    
+    return values
+
+
+def _document_type_update_values(document_type_data: DocumentTypeUpdate) -> dict:
+    """
+    Columnas a actualizar a partir de un DocumentTypeUpdate
+    
+    Solo incluye lo que el cliente envió (exclude_unset).
+    
+    Args:
+        document_type_data: Datos de actualización
+        
+    Returns:
+        dict: Columna -> valor
+    """
+    return _document_type_column_values(document_type_data.model_dump(exclude_unset=True))
+
+
+def _escape_like(value: str) -> str:
+    """Escapar comodines de LIKE (%, _) para buscar el texto literal"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _encode_list_cursor(sort_value, document_type_id: int) -> str:
+    """Codificar (valor de orden, id) de la última fila como cursor opaco"""
+    return base64.urlsafe_b64encode(orjson.dumps([sort_value, document_type_id])).decode()
+
+
+def _decode_list_cursor(cursor: str, order_column) -> tuple:
+    """
+    Decodificar un cursor generado por _encode_list_cursor
+    
+    Args:
+        cursor: Cursor recibido del cliente
+        order_column: Expresión de ordenamiento actual (de SORT_COLUMNS)
+        
+    Returns:
+        tuple: (valor de orden, id)
+        
+    Raises:
+        HTTPException: Si el cursor no es válido
+    """
+    try:
+        sort_value, document_type_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        # orjson serializa datetime como ISO 8601
+        if sort_value is not None and isinstance(order_column.type, DateTime):
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(document_type_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+def _list_total_cache_key(filters: tuple) -> str:
+    """Clave de cache del total para una combinación de filtros"""
+    return "dt:total:" + hashlib.sha1(repr(filters).encode()).hexdigest()
+
+
+def _get_cached_list_total(cache_key: str) -> Optional[int]:
+    """Obtener un total cacheado (Redis si está configurado)"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            cached = client.get(cache_key)
+            return int(cached) if cached is not None else None
+        except Exception as e:
+            logger.warning(f"Error leyendo total cacheado desde Redis: {str(e)}")
+    return _list_total_cache.get(cache_key)
+
+
+def _set_cached_list_total(cache_key: str, total: int) -> None:
+    """Guardar un total durante LIST_TOTAL_TTL segundos"""
+    client = get_redis_client()
+    if client is not None:
+        try:
+            client.set(cache_key, total, ex=LIST_TOTAL_TTL)
+            return
+        except Exception as e:
+            logger.warning(f"Error guardando total en Redis: {str(e)}")
+    _list_total_cache.set(cache_key, total)
+
+
+def _estimate_document_types_total(db: Session) -> Optional[int]:
+    """
+    Estimación del planificador (reltuples) para listados sin filtros
+    
+    Returns:
+        Optional[int]: Estimación, o None si la tabla es pequeña (o nunca se
+        analizó) y conviene contar
+    """
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'document_types'")
+    ).scalar()
+    if estimate is not None and estimate >= LIST_TOTAL_ESTIMATE_MIN_ROWS:
+        return estimate
+    return None
+
+
+# Los endpoints que usan la sesión síncrona se declaran con def: FastAPI los
+# ejecuta en su threadpool y las consultas no bloquean el event loop.
+
 
 # === ENDPOINTS DE CONSULTA ===
 
 @router.get("/", response_model=DocumentTypeListResponse)
-async def list_document_types(
+def list_document_types(
     # Filtros
     search: Optional[str] = Query(None, description="Búsqueda por código o nombre"),
     is_active: Optional[bool] = Query(None, description="Filtrar por activo"),
@@ -71,7 +367,9 @@ async def list_document_types(
     created_by: Optional[int] = Query(None, description="Filtrar por creador"),
     
     # Paginación
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: PaginationParams = Depends(get_pagination_params),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente (next_cursor)"),
+    include_total: bool = Query(False, description="Incluir total y total_pages (consulta adicional)"),
     
     # Dependencias
     db: Session = Depends(get_db),
@@ -87,6 +385,9 @@ async def list_document_types(
         can_generate: Filtrar por capacidad de generación
         created_by: Filtrar por usuario creador
         pagination: Parámetros de paginación
+        cursor: Cursor opaco devuelto como next_cursor; si se envía, la página
+            se obtiene por keyset en lugar de OFFSET
+        include_total: Calcular total (cacheado); has_more no lo necesita
         db: Sesión de base de datos
         current_user: Usuario actual
         
@@ -94,25 +395,25 @@ async def list_document_types(
         DocumentTypeListResponse: Lista paginada de tipos de documento
     """
     try:
-        # Query base
-        query = db.query(DocumentType)
+        # Aplicar ordenamiento (valores desconocidos ordenan por fecha de creación)
+        order_column = SORT_COLUMNS.get(pagination.sort_by, DocumentType.created_at)
+        
+        # Query base: filas planas con las columnas del resumen, template_path
+        # (para can_generate) y la columna de orden (para el cursor); sin
+        # instancias ORM ni validación Pydantic por fila
+        query = db.query(
+            *SUMMARY_COLUMNS,
+            DocumentType.template_path,
+            order_column.label("sort_value")
+        )
         
         # Aplicar filtros
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    DocumentType.code.ilike(search_term),
-                    DocumentType.name.ilike(search_term),
-                    DocumentType.description.ilike(search_term)
-                )
-            )
+        # No admins solo ven tipos activos
+        if is_active is None and not current_user.is_admin:
+            is_active = True
         
         if is_active is not None:
             query = query.filter(DocumentType.is_active == is_active)
-        elif not current_user.is_admin:
-            # No admins solo ven tipos activos
-            query = query.filter(DocumentType.is_active == True)
         
         if requires_qr is not None:
             query = query.filter(DocumentType.requires_qr == requires_qr)
@@ -136,56 +437,323 @@ async def list_document_types(
         if created_by is not None:
             query = query.filter(DocumentType.created_by == created_by)
         
-        # Contar total
-        total = query.count()
-        
-        # Aplicar ordenamiento
-        if pagination.sort_by == "name":
-            order_column = DocumentType.name
-        elif pagination.sort_by == "code":
-            order_column = DocumentType.code
-        elif pagination.sort_by == "created_at":
-            order_column = DocumentType.created_at
-        elif pagination.sort_by == "updated_at":
-            order_column = DocumentType.updated_at
-        elif pagination.sort_by == "documents_count":
-            order_column = DocumentType.documents_count
-        elif pagination.sort_by == "sort_order":
-            order_column = DocumentType.sort_order
+        if search:
+            # La mayoría de búsquedas son el inicio de un código: si alguno
+            # coincide (sondeo EXISTS por índice) se filtra solo por prefijo;
+            # si no, búsqueda por subcadena en código, nombre y descripción.
+            # El modo depende solo de los datos, así que es estable entre páginas.
+            code_prefix = DocumentType.code.like(
+                _escape_like(search.upper()) + "%", escape="\\"
+            )
+            if db.query(query.filter(code_prefix).exists()).scalar():
+                query = query.filter(code_prefix)
+            else:
+                search_term = f"%{search}%"
+                query = query.filter(
+                    or_(
+                        DocumentType.code.ilike(search_term),
+                        DocumentType.name.ilike(search_term),
+                        DocumentType.description.ilike(search_term)
+                    )
+                )
+        
+        # Total solo si se pide: cache, estimación sin filtros o, al paginar
+        # por OFFSET, COUNT(*) OVER () en la misma consulta de la página
+        total = None
+        total_cached = False
+        count_query = query
+        if include_total:
+            filters = (search, is_active, requires_qr, can_generate, created_by)
+            total_key = _list_total_cache_key(filters)
+            total = _get_cached_list_total(total_key)
+            total_cached = total is not None
+            if total is None and all(value is None for value in filters):
+                total = _estimate_document_types_total(db)
+            if total is None and cursor is not None:
+                # Con cursor la ventana solo vería las filas posteriores
+                total = count_query.count()
+        windowed_total = include_total and total is None
+        
+        # El id desempata filas con el mismo valor y fija el orden entre páginas
+        descending = pagination.sort_order == "desc"
+        if descending:
+            query = query.order_by(order_column.desc(), DocumentType.id.desc())
+        else:
+            query = query.order_by(order_column, DocumentType.id)
+        
+        # Aplicar paginación: keyset si hay cursor, OFFSET en caso contrario
+        if cursor is not None:
+            cursor_key = tuple_(order_column, DocumentType.id)
+            cursor_value = tuple_(*_decode_list_cursor(cursor, order_column))
+            query = query.filter(cursor_key < cursor_value if descending else cursor_key > cursor_value)
+        else:
+            query = query.offset(pagination.offset)
+        
+        # Una fila extra indica si hay página siguiente sin necesidad de contar
+        if windowed_total:
+            rows = query.add_columns(func.count().over().label("total")).limit(pagination.limit + 1).all()
+            # Página más allá del final: no hay filas de las que leer el total
+            total = rows[0].total if rows else count_query.count()
         else:
-            order_column = DocumentType.created_at
+            rows = query.limit(pagination.limit + 1).all()
+        
+        if include_total and not total_cached:
+            _set_cached_list_total(total_key, total)
+        
+        has_more = len(rows) > pagination.limit
+        del rows[pagination.limit:]
+        
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = _encode_list_cursor(last.sort_value, last.id)
+        
+        # Lectura de confianza: los valores vienen tal cual de la base de datos,
+        # así que los dicts se arman directamente de las tuplas (zip se detiene
+        # en las claves del resumen e ignora las columnas auxiliares)
+        document_types = []
+        for row in rows:
+            item = dict(zip(SUMMARY_KEYS, row))
+            item["can_generate"] = bool(row.template_path) and row.is_active
+            document_types.append(item)
+        
+        # Respuesta serializada con orjson; response_model queda solo para la
+        # documentación OpenAPI (FastAPI no revalida un Response ya construido)
+        return ORJSONResponse({
+            "document_types": document_types,
+            "total": total,
+            "page": pagination.page,
+            "page_size": pagination.page_size,
+            "total_pages": (
+                (total + pagination.page_size - 1) // pagination.page_size
+                if total is not None else None
+            ),
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listando tipos de documento: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al obtener tipos de documento"
+        )
+
+
+# === ENDPOINTS DE EXPORTACIÓN ===
+# Declarados antes de /{document_type_id} para que "/export" y "/stats" no se
+# interpreten como un ID
+
+@router.get("/export", response_model=List[DocumentTypeExport])
+def export_document_types(
+    format: str = Query("json", regex="^(json|csv)$"),
+    include_inactive: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin),
+    log_action = Depends(get_request_logger)
+):
+    """
+    Exportar tipos de documento
+    
+    Args:
+        format: Formato de exportación (json, csv)
+        include_inactive: Incluir tipos inactivos
+        db: Sesión de base de datos
+        current_user: Usuario administrador
+        log_action: Logger de acciones
+        
+    Returns:
+        List[DocumentTypeExport] o StreamingResponse: Datos exportados (JSON)
+        o archivo CSV en streaming
+    """
+    try:
+        if format == "csv":
+            return _stream_document_types_csv(db, include_inactive, log_action)
+        
+        # Solo las columnas de DocumentTypeExport, como filas planas: los
+        # dicts se arman directamente, sin instancias ORM ni validación por fila
+        stmt = select(*EXPORT_COLUMNS)
+        if not include_inactive:
+            stmt = stmt.where(DocumentType.is_active == True)
         
-        if pagination.sort_order == "desc":
-            order_column = order_column.desc()
+        export_data = [dict(zip(EXPORT_KEYS, row)) for row in db.execute(stmt)]
         
-        query = query.order_by(order_column)
+        # Log de exportación
+        log_action("document_types_exported", {
+            "format": format,
+            "count": len(export_data),
+            "include_inactive": include_inactive
+        })
         
-        # Aplicar paginación
-        document_types = query.offset(pagination.offset).limit(pagination.limit).all()
+        logger.info(f"Exportados {len(export_data)} tipos de documento en formato {format}")
         
-        # Convertir a schemas de respuesta
-        document_types_summary = [
-            DocumentTypeSummary.from_orm(dt) for dt in document_types
-        ]
+        # orjson directo: response_model queda solo para la documentación
+        return ORJSONResponse(export_data)
         
-        return DocumentTypeListResponse(
-            document_types=document_types_summary,
-            total=total,
-            page=pagination.page,
-            page_size=pagination.page_size,
-            total_pages=(total + pagination.page_size - 1) // pagination.page_size
+    except Exception as e:
+        logger.error(f"Error exportando tipos de documento: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al exportar tipos de documento"
         )
+
+
+def _stream_document_types_csv(
+    db: Session,
+    include_inactive: bool,
+    log_action
+) -> StreamingResponse:
+    """
+    Exportar tipos de documento como CSV en streaming
+    
+    Las filas se leen con un cursor del servidor en bloques de
+    EXPORT_YIELD_PER y se envían a medida que llegan, sin cargar la tabla en
+    memoria ni crear instancias ORM o esquemas Pydantic.
+    
+    Args:
+        db: Sesión de base de datos (sigue abierta mientras dura la respuesta)
+        include_inactive: Incluir tipos inactivos
+        log_action: Logger de acciones
+        
+    Returns:
+        StreamingResponse: Archivo CSV
+    """
+    stmt = select(*EXPORT_COLUMNS)
+    if not include_inactive:
+        stmt = stmt.where(DocumentType.is_active == True)
+    
+    result = db.execute(
+        stmt.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+    )
+    
+    def csv_chunks():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_KEYS)
+        count = 0
+        try:
+            for rows in result.partitions():
+                writer.writerows(rows)
+                count += len(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            # Encabezado solo (sin filas)
+            if buffer.tell():
+                yield buffer.getvalue()
+        finally:
+            result.close()
+        
+        log_action("document_types_exported", {
+            "format": "csv",
+            "count": count,
+            "include_inactive": include_inactive
+        })
+        logger.info(f"Exportados {count} tipos de documento en formato csv")
+    
+    return StreamingResponse(
+        csv_chunks(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="tipos_documento.csv"'}
+    )
+
+
+# === ENDPOINTS DE ESTADÍSTICAS ===
+
+@router.get("/stats")
+def get_document_types_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Obtener estadísticas de tipos de documento
+    
+    Args:
+        db: Sesión de base de datos
+        current_user: Usuario actual
+        
+    Returns:
+        dict: Estadísticas de tipos de documento
+    """
+    cached = _stats_cache.get("stats")
+    if cached is not None:
+        return cached
+    
+    try:
+        # Estadísticas básicas: todos los conteos en una sola consulta, con
+        # FILTER para cada subconjunto (la tabla se recorre una sola vez)
+        counts = db.execute(
+            select(
+                func.count().label("total"),
+                func.count().filter(DocumentType.is_active == True).label("active"),
+                func.count().filter(DocumentType.requires_qr == True).label("with_qr"),
+                func.count().filter(DocumentType.template_path.isnot(None)).label("with_templates"),
+                func.count().filter(DocumentType.requires_approval == True).label("requires_approval"),
+            ).select_from(DocumentType)
+        ).one()
+        total_types = counts.total
+        active_types = counts.active
+        types_with_qr = counts.with_qr
+        types_with_templates = counts.with_templates
+        
+        # Tipos más usados (por documentos)
+        top_types = db.query(
+            DocumentType.code,
+            DocumentType.name,
+            func.count(Document.id).label('document_count')
+        ).outerjoin(Document).group_by(
+            DocumentType.id, DocumentType.code, DocumentType.name
+        ).order_by(func.count(Document.id).desc()).limit(5).all()
+        
+        # Distribución por estado
+        status_distribution = {
+            "active": active_types,
+            "inactive": total_types - active_types
+        }
+        
+        # Distribución por características
+        feature_distribution = {
+            "requires_qr": types_with_qr,
+            "has_template": types_with_templates,
+            "requires_approval": counts.requires_approval
+        }
+        
+        result = {
+            "summary": {
+                "total_types": total_types,
+                "active_types": active_types,
+                "inactive_types": total_types - active_types,
+                "with_qr": types_with_qr,
+                "with_templates": types_with_templates
+            },
+            "status_distribution": status_distribution,
+            "feature_distribution": feature_distribution,
+            "top_used_types": [
+                {
+                    "code": code,
+                    "name": name,
+                    "document_count": count
+                }
+                for code, name, count in top_types
+            ],
+            "generated_at": datetime.utcnow().isoformat()
+        }
+        
+        _stats_cache.set("stats", result)
+        return result
         
     except Exception as e:
-        logger.error(f"Error listando tipos de documento: {str(e)}")
+        logger.error(f"Error obteniendo estadísticas: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al obtener tipos de documento"
+            detail="Error al obtener estadísticas"
         )
 
 
 @router.get("/{document_type_id}", response_model=DocumentTypeSchema)
-async def get_document_type(
+def get_document_type(
     document_type: DocumentType = Depends(get_document_type_by_id)
 ):
     """
@@ -197,11 +765,11 @@ async def get_document_type(
     Returns:
         DocumentTypeSchema: Tipo de documento completo
     """
-    return DocumentTypeSchema.from_orm(document_type)
+    return _document_type_response(document_type)
 
 
 @router.get("/code/{type_code}", response_model=DocumentTypeSchema)
-async def get_document_type_by_code(
+def get_document_type_by_code(
     type_code: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -217,30 +785,39 @@ async def get_document_type_by_code(
     Returns:
         DocumentTypeSchema: Tipo de documento encontrado
     """
-    document_type = db.query(DocumentType).filter(
-        DocumentType.code == type_code.upper()
-    ).first()
+    code = type_code.upper()
     
-    if not document_type:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tipo de documento no encontrado"
-        )
+    # Los aciertos de cache no tocan la base de datos
+    data = _get_cached_document_type_by_code(code)
+    if data is None:
+        document_type = db.query(DocumentType).filter(
+            DocumentType.code == code
+        ).first()
+        
+        if not document_type:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Tipo de documento no encontrado"
+            )
+        
+        data = DocumentTypeSchema.model_validate(document_type).model_dump(mode="json")
+        _set_cached_document_type_by_code(code, data)
     
     # Verificar acceso
-    if not document_type.is_active and not current_user.is_admin:
+    if not data["is_active"] and not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tipo de documento no encontrado"
         )
     
-    return DocumentTypeSchema.from_orm(document_type)
+    return ORJSONResponse(data)
 
 
 # === ENDPOINTS DE CREACIÓN Y MODIFICACIÓN ===
 
 @router.post("/", response_model=DocumentTypeSchema, status_code=status.HTTP_201_CREATED)
-async def create_document_type(
+def create_document_type(
+    background_tasks: BackgroundTasks,
     document_type_data: DocumentTypeCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_manage_types_permission),
@@ -251,6 +828,7 @@ async def create_document_type(
     Crear nuevo tipo de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type_data: Datos del tipo de documento
         db: Sesión de base de datos
         current_user: Usuario actual (con permisos)
@@ -271,58 +849,28 @@ async def create_document_type(
                 detail=f"Ya existe un tipo de documento con el código: {document_type_data.code}"
             )
         
-        # Crear tipo de documento
+        # Crear tipo de documento con sus requisitos y configuración de
+        # archivos, UI, workflow y QR (este último solo si se envía)
         document_type = DocumentType(
+            **_document_type_column_values(
+                document_type_data.model_dump(include=set(FIELD_GROUPS))
+            ),
             code=document_type_data.code.upper(),
             name=document_type_data.name,
             description=document_type_data.description,
-            
-            # Requisitos
-            requires_qr=document_type_data.requirements.requires_qr,
-            requires_cedula=document_type_data.requirements.requires_cedula,
-            requires_nombre=document_type_data.requirements.requires_nombre,
-            requires_telefono=document_type_data.requirements.requires_telefono,
-            requires_email=document_type_data.requirements.requires_email,
-            requires_direccion=document_type_data.requirements.requires_direccion,
-            
-            # Configuración de archivos
-            allowed_file_types=document_type_data.file_config.allowed_file_types,
-            max_file_size_mb=document_type_data.file_config.max_file_size_mb,
-            allow_multiple_files=document_type_data.file_config.allow_multiple_files,
-            
-            # Configuración de UI
-            color=document_type_data.ui_config.color,
-            icon=document_type_data.ui_config.icon,
-            sort_order=document_type_data.ui_config.sort_order,
-            
-            # Configuración de workflow
-            requires_approval=document_type_data.workflow.requires_approval,
-            auto_notify_email=document_type_data.workflow.auto_notify_email,
-            notification_emails=document_type_data.workflow.notification_emails,
-            retention_days=document_type_data.workflow.retention_days,
-            auto_archive=document_type_data.workflow.auto_archive,
-            
-            # Plantilla y QR
             template_path=document_type_data.template_path,
             
             # Auditoría
             created_by=current_user.id
         )
         
-        # Configuración de QR si se requiere
-        if document_type_data.qr_config:
-            document_type.qr_table_number = document_type_data.qr_config.qr_table_number
-            document_type.qr_row = document_type_data.qr_config.qr_row
-            document_type.qr_column = document_type_data.qr_config.qr_column
-            document_type.qr_width = document_type_data.qr_config.qr_width
-            document_type.qr_height = document_type_data.qr_config.qr_height
-        
         db.add(document_type)
         db.commit()
         db.refresh(document_type)
+        invalidate_document_type_code_cache(document_type.code)
         
         # Log de creación
-        log_action("document_type_created", {
+        background_tasks.add_task(log_action, "document_type_created", {
             "document_type_id": document_type.id,
             "code": document_type.code,
             "name": document_type.name
@@ -330,7 +878,7 @@ async def create_document_type(
         
         logger.info(f"Tipo de documento creado: {document_type.code} por usuario {current_user.email}")
         
-        return DocumentTypeSchema.from_orm(document_type)
+        return _document_type_response(document_type, status.HTTP_201_CREATED)
         
     except HTTPException:
         raise
@@ -344,7 +892,8 @@ async def create_document_type(
 
 
 @router.put("/{document_type_id}", response_model=DocumentTypeSchema)
-async def update_document_type(
+def update_document_type(
+    background_tasks: BackgroundTasks,
     document_type_data: DocumentTypeUpdate,
     document_type: DocumentType = Depends(get_document_type_by_id),
     db: Session = Depends(get_db),
@@ -355,6 +904,7 @@ async def update_document_type(
     Actualizar tipo de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type_data: Datos actualizados
         document_type: Tipo de documento existente
         db: Sesión de base de datos
@@ -379,57 +929,19 @@ async def update_document_type(
             "is_active": document_type.is_active
         }
         
-        # Actualizar campos básicos
-        if document_type_data.name is not None:
-            document_type.name = document_type_data.name
-        if document_type_data.description is not None:
-            document_type.description = document_type_data.description
-        if document_type_data.is_active is not None:
-            document_type.is_active = document_type_data.is_active
-        
-        # Actualizar configuraciones si se proporcionan
-        if document_type_data.requirements:
-            document_type.requires_qr = document_type_data.requirements.requires_qr
-            document_type.requires_cedula = document_type_data.requirements.requires_cedula
-            document_type.requires_nombre = document_type_data.requirements.requires_nombre
-            document_type.requires_telefono = document_type_data.requirements.requires_telefono
-            document_type.requires_email = document_type_data.requirements.requires_email
-            document_type.requires_direccion = document_type_data.requirements.requires_direccion
-        
-        if document_type_data.file_config:
-            document_type.allowed_file_types = document_type_data.file_config.allowed_file_types
-            document_type.max_file_size_mb = document_type_data.file_config.max_file_size_mb
-            document_type.allow_multiple_files = document_type_data.file_config.allow_multiple_files
-        
-        if document_type_data.ui_config:
-            document_type.color = document_type_data.ui_config.color
-            document_type.icon = document_type_data.ui_config.icon
-            document_type.sort_order = document_type_data.ui_config.sort_order
-        
-        if document_type_data.workflow:
-            document_type.requires_approval = document_type_data.workflow.requires_approval
-            document_type.auto_notify_email = document_type_data.workflow.auto_notify_email
-            document_type.notification_emails = document_type_data.workflow.notification_emails
-            document_type.retention_days = document_type_data.workflow.retention_days
-            document_type.auto_archive = document_type_data.workflow.auto_archive
-        
-        # Actualizar configuración de plantilla
-        if document_type_data.template_path is not None:
-            document_type.template_path = document_type_data.template_path
-        
-        # Actualizar configuración de QR
-        if document_type_data.qr_config:
-            document_type.qr_table_number = document_type_data.qr_config.qr_table_number
-            document_type.qr_row = document_type_data.qr_config.qr_row
-            document_type.qr_column = document_type_data.qr_config.qr_column
-            document_type.qr_width = document_type_data.qr_config.qr_width
-            document_type.qr_height = document_type_data.qr_config.qr_height
+        # Un solo UPDATE con las columnas que el cliente envió
+        values = _document_type_update_values(document_type_data)
+        if values:
+            db.query(DocumentType).filter_by(id=document_type.id).update(
+                values, synchronize_session=False
+            )
         
         db.commit()
         db.refresh(document_type)
+        invalidate_document_type_code_cache(document_type.code)
         
         # Log de actualización
-        log_action("document_type_updated", {
+        background_tasks.add_task(log_action, "document_type_updated", {
             "document_type_id": document_type.id,
             "code": document_type.code,
             "changes": {
@@ -441,7 +953,7 @@ async def update_document_type(
         
         logger.info(f"Tipo de documento actualizado: {document_type.code}")
         
-        return DocumentTypeSchema.from_orm(document_type)
+        return _document_type_response(document_type)
         
     except HTTPException:
         raise
@@ -455,7 +967,8 @@ async def update_document_type(
 
 
 @router.patch("/{document_type_id}/admin", response_model=DocumentTypeSchema)
-async def admin_update_document_type(
+def admin_update_document_type(
+    background_tasks: BackgroundTasks,
     document_type_data: DocumentTypeAdminUpdate,
     document_type: DocumentType = Depends(get_document_type_by_id),
     db: Session = Depends(get_db),
@@ -466,6 +979,7 @@ async def admin_update_document_type(
     Actualización administrativa de tipo de documento (solo admins)
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type_data: Datos de actualización administrativa
         document_type: Tipo de documento existente
         db: Sesión de base de datos
@@ -476,66 +990,50 @@ async def admin_update_document_type(
         DocumentTypeSchema: Tipo de documento actualizado
     """
     try:
+        original_code = document_type.code
+        
+        values = _document_type_update_values(document_type_data)
+        
         # Verificar cambio de código (solo admins)
-        if document_type_data.code and document_type_data.code != document_type.code:
+        new_code = values.pop("code", None)
+        if new_code and new_code.upper() != document_type.code:
             # Verificar que el nuevo código no exista
             existing = db.query(DocumentType).filter(
-                DocumentType.code == document_type_data.code.upper(),
+                DocumentType.code == new_code.upper(),
                 DocumentType.id != document_type.id
             ).first()
             
             if existing:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Ya existe un tipo con el código: {document_type_data.code}"
+                    detail=f"Ya existe un tipo con el código: {new_code}"
                 )
             
-            old_code = document_type.code
-            document_type.code = document_type_data.code.upper()
+            values["code"] = new_code.upper()
             
-            log_action("document_type_code_changed", {
+            background_tasks.add_task(log_action, "document_type_code_changed", {
                 "document_type_id": document_type.id,
-                "old_code": old_code,
-                "new_code": document_type.code
+                "old_code": original_code,
+                "new_code": values["code"]
             })
         
-        # Actualizar otros campos administrativos
-        if document_type_data.is_system_type is not None:
-            document_type.is_system_type = document_type_data.is_system_type
-        
-        # Aplicar otras actualizaciones usando el método padre
-        # Convertir a DocumentTypeUpdate para reutilizar lógica
-        regular_update = DocumentTypeUpdate(
-            name=document_type_data.name,
-            description=document_type_data.description,
-            requirements=document_type_data.requirements,
-            file_config=document_type_data.file_config,
-            ui_config=document_type_data.ui_config,
-            workflow=document_type_data.workflow,
-            template_path=document_type_data.template_path,
-            qr_config=document_type_data.qr_config,
-            is_active=document_type_data.is_active
-        )
-        
-        # Aplicar actualizaciones regulares
-        if regular_update.name is not None:
-            document_type.name = regular_update.name
-        if regular_update.description is not None:
-            document_type.description = regular_update.description
-        if regular_update.is_active is not None:
-            document_type.is_active = regular_update.is_active
-        
-        # ... (aplicar otras configuraciones igual que en update_document_type)
+        # Un solo UPDATE con los campos enviados (incluye is_system_type y las
+        # mismas configuraciones que update_document_type)
+        if values:
+            db.query(DocumentType).filter_by(id=document_type.id).update(
+                values, synchronize_session=False
+            )
         
         db.commit()
         db.refresh(document_type)
+        invalidate_document_type_code_cache(original_code, document_type.code)
         
-        log_action("document_type_admin_updated", {
+        background_tasks.add_task(log_action, "document_type_admin_updated", {
             "document_type_id": document_type.id,
             "code": document_type.code
         })
         
-        return DocumentTypeSchema.from_orm(document_type)
+        return _document_type_response(document_type)
         
     except HTTPException:
         raise
@@ -551,7 +1049,7 @@ async def admin_update_document_type(
 # === ENDPOINTS DE VALIDACIÓN ===
 
 @router.post("/validate", response_model=DocumentTypeValidationResponse)
-async def validate_document_data(
+def validate_document_data(
     validation_data: DocumentTypeValidation,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -579,15 +1077,17 @@ async def validate_document_data(
                 detail="Tipo de documento no encontrado"
             )
         
+        # Campos requeridos calculados una sola vez para validar y responder
+        required_fields = document_type.required_fields
+        
         # Validar datos usando el método del modelo
-        is_valid, errors = document_type.validate_document_data(validation_data.data)
+        is_valid, errors = document_type.validate_document_data(
+            validation_data.data, required_fields
+        )
         
-        # Obtener campos requeridos y faltantes
-        required_fields = document_type.required_fields
-        missing_fields = [
-            field for field in required_fields
-            if field not in validation_data.data or not validation_data.data[field]
-        ]
+        # Obtener campos faltantes
+        data = validation_data.data
+        missing_fields = [field for field in required_fields if not data.get(field)]
         
         return DocumentTypeValidationResponse(
             is_valid=is_valid,
@@ -610,7 +1110,8 @@ async def validate_document_data(
 # === ENDPOINTS DE OPERACIONES ESPECIALES ===
 
 @router.post("/clone", response_model=DocumentTypeSchema)
-async def clone_document_type(
+def clone_document_type(
+    background_tasks: BackgroundTasks,
     clone_data: DocumentTypeClone,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_manage_types_permission),
@@ -621,6 +1122,7 @@ async def clone_document_type(
     Clonar tipo de documento existente
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         clone_data: Datos para la clonación
         db: Sesión de base de datos
         current_user: Usuario actual
@@ -661,33 +1163,42 @@ async def clone_document_type(
         
         # Copiar plantilla si se solicita
         if clone_data.copy_template and source_type.template_path:
+            source_path = TEMPLATES_DIR / source_type.template_path
+            new_template_name = f"{clone_data.new_code.lower()}_template.docx"
             try:
-                # Implementar copia de plantilla
-                source_path = os.path.join(settings.TEMPLATES_PATH, source_type.template_path)
-                if os.path.exists(source_path):
-                    new_template_name = f"{clone_data.new_code.lower()}_template.docx"
-                    dest_path = os.path.join(settings.TEMPLATES_PATH, new_template_name)
-                    shutil.copy2(source_path, dest_path)
-                    cloned_type.template_path = new_template_name
+                # Si la plantilla origen no existe, copy2 falla sin un stat previo
+                shutil.copy2(source_path, TEMPLATES_DIR / new_template_name)
+                cloned_type.template_path = new_template_name
+            except FileNotFoundError:
+                logger.warning(f"Plantilla origen no encontrada: {source_path}")
             except Exception as e:
                 logger.warning(f"Error copiando plantilla: {str(e)}")
         
-        db.add(cloned_type)
-        db.commit()
-        db.refresh(cloned_type)
+        # Fechas explícitas: con el default func.now() el objeto quedaría
+        # expirado tras el INSERT y habría que releerlo (db.refresh)
+        cloned_type.created_at = cloned_type.updated_at = datetime.utcnow()
         
-        # Log de clonación
-        log_action("document_type_cloned", {
+        # flush asigna el id; la respuesta y el log se arman con el objeto en
+        # memoria antes del commit, que expira sus atributos
+        db.add(cloned_type)
+        db.flush()
+        response = _document_type_response(cloned_type)
+        clone_info = {
             "source_id": clone_data.source_id,
             "source_code": source_type.code,
             "new_id": cloned_type.id,
             "new_code": cloned_type.code,
             "template_copied": clone_data.copy_template
-        })
+        }
+        db.commit()
+        invalidate_document_type_code_cache(clone_info["new_code"])
+        
+        # Log de clonación
+        background_tasks.add_task(log_action, "document_type_cloned", clone_info)
         
-        logger.info(f"Tipo clonado: {source_type.code} -> {cloned_type.code}")
+        logger.info(f"Tipo clonado: {clone_info['source_code']} -> {clone_info['new_code']}")
         
-        return DocumentTypeSchema.from_orm(cloned_type)
+        return response
         
     except HTTPException:
         raise
@@ -701,7 +1212,8 @@ async def clone_document_type(
 
 
 @router.patch("/{document_type_id}/toggle")
-async def toggle_document_type_status(
+def toggle_document_type_status(
+    background_tasks: BackgroundTasks,
     document_type: DocumentType = Depends(get_document_type_by_id),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_manage_types_permission),
@@ -711,35 +1223,36 @@ async def toggle_document_type_status(
     Activar/desactivar tipo de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type: Tipo de documento
         db: Sesión de base de datos
         current_user: Usuario actual
         log_action: Logger de acciones
         
     Returns:
-        dict: Estado actualizado
+        ORJSONResponse: Solo el nuevo estado ({"is_active": ...})
     """
     try:
         old_status = document_type.is_active
-        document_type.is_active = not document_type.is_active
-        
-        db.commit()
+        document_type.is_active = not old_status
         
-        log_action("document_type_toggled", {
+        # Leídos antes del commit, que expira los atributos del objeto
+        toggle_info = {
             "document_type_id": document_type.id,
             "code": document_type.code,
             "old_status": old_status,
             "new_status": document_type.is_active
-        })
+        }
+        
+        db.commit()
+        invalidate_document_type_code_cache(toggle_info["code"])
         
-        action = "activado" if document_type.is_active else "desactivado"
-        logger.info(f"Tipo de documento {action}: {document_type.code}")
+        background_tasks.add_task(log_action, "document_type_toggled", toggle_info)
         
-        return {
-            "message": f"Tipo de documento {action}",
-            "is_active": document_type.is_active,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        action = "activado" if toggle_info["new_status"] else "desactivado"
+        logger.info(f"Tipo de documento {action}: {toggle_info['code']}")
+        
+        return ORJSONResponse({"is_active": toggle_info["new_status"]})
         
     except Exception as e:
         logger.error(f"Error cambiando estado: {str(e)}")
@@ -750,8 +1263,9 @@ async def toggle_document_type_status(
         )
 
 
-@router.delete("/{document_type_id}")
-async def delete_document_type(
+@router.delete("/{document_type_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_document_type(
+    background_tasks: BackgroundTasks,
     document_type: DocumentType = Depends(get_document_type_by_id),
     force: bool = Query(False, description="Forzar eliminación even with documents"),
     db: Session = Depends(get_db),
@@ -763,6 +1277,7 @@ async def delete_document_type(
     Eliminar tipo de documento (solo administradores)
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type: Tipo de documento
         force: Forzar eliminación incluso con documentos asociados
         db: Sesión de base de datos
@@ -770,7 +1285,7 @@ async def delete_document_type(
         log_action: Logger de acciones
         
     Returns:
-        dict: Confirmación de eliminación
+        Response: 204 sin cuerpo
     """
     try:
         # Verificar si es tipo de sistema
@@ -780,14 +1295,17 @@ async def delete_document_type(
                 detail="Los tipos de sistema no pueden ser eliminados"
             )
         
-        # Verificar documentos asociados
-        doc_count = db.query(Document).filter(
-            Document.document_type_id == document_type.id
-        ).count()
-        
-        qr_count = db.query(QRCode).filter(
-            QRCode.document_type_id == document_type.id
-        ).count()
+        # Verificar documentos y códigos QR asociados en una sola consulta
+        doc_count, qr_count = db.execute(
+            select(
+                select(func.count(Document.id))
+                .where(Document.document_type_id == document_type.id)
+                .scalar_subquery(),
+                select(func.count(QRCode.id))
+                .where(QRCode.document_type_id == document_type.id)
+                .scalar_subquery()
+            )
+        ).one()
         
         if (doc_count > 0 or qr_count > 0) and not force:
             raise HTTPException(
@@ -797,11 +1315,12 @@ async def delete_document_type(
         
         # Eliminar plantilla si existe
         if document_type.template_path:
+            template_path = TEMPLATES_DIR / document_type.template_path
             try:
-                template_path = os.path.join(settings.TEMPLATES_PATH, document_type.template_path)
-                if os.path.exists(template_path):
-                    os.remove(template_path)
-                    logger.info(f"Plantilla eliminada: {template_path}")
+                template_path.unlink()
+                logger.info(f"Plantilla eliminada: {template_path}")
+            except FileNotFoundError:
+                pass
             except Exception as e:
                 logger.warning(f"Error eliminando plantilla: {str(e)}")
         
@@ -817,20 +1336,17 @@ async def delete_document_type(
         # Eliminar tipo de documento
         db.delete(document_type)
         db.commit()
+        invalidate_document_type_code_cache(type_info["code"])
         
         # Log de eliminación
-        log_action("document_type_deleted", {
+        background_tasks.add_task(log_action, "document_type_deleted", {
             **type_info,
             "forced": force
         })
         
         logger.info(f"Tipo de documento eliminado: {type_info['code']}")
         
-        return {
-            "message": "Tipo de documento eliminado",
-            "deleted_type": type_info,
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
         
     except HTTPException:
         raise
@@ -845,8 +1361,111 @@ async def delete_document_type(
 
 # === ENDPOINTS DE OPERACIONES EN LOTE ===
 
+def _apply_bulk_action(
+    db: Session,
+    action: str,
+    type_ids: List[int]
+) -> Tuple[DocumentTypeBulkActionResponse, List[str]]:
+    """
+    Aplicar una acción en lote sin confirmar la transacción
+    
+    Lo comparten /bulk-action y /batch; quien llama hace el commit (una sola
+    vez) e invalida el cache de los códigos afectados.
+    
+    Args:
+        db: Sesión de base de datos
+        action: activate, deactivate o delete
+        type_ids: IDs de tipos
+        
+    Returns:
+        Tuple[DocumentTypeBulkActionResponse, List[str]]: Resultado y códigos afectados
+    """
+    success_count = 0
+    error_count = 0
+    errors = []
+    
+    requested_ids = set(type_ids)
+    
+    if action == "delete":
+        # Un solo DELETE de los tipos elegibles (no de sistema y sin
+        # documentos); RETURNING indica cuáles se eliminaron
+        deleted = db.execute(
+            delete(DocumentType)
+            .where(
+                DocumentType.id.in_(requested_ids),
+                DocumentType.is_system_type == False,
+                ~exists().where(Document.document_type_id == DocumentType.id)
+            )
+            .returning(DocumentType.id, DocumentType.code)
+        ).all()
+        affected_codes = [row.code for row in deleted]
+        success_count = len(deleted)
+        
+        # Los omitidos se clasifican (de sistema / con documentos / no
+        # encontrados) con una consulta más
+        skipped_ids = requested_ids - {row.id for row in deleted}
+        skipped = []
+        if skipped_ids:
+            skipped = db.query(
+                DocumentType.id,
+                DocumentType.is_system_type,
+                func.count(Document.id).label("doc_count")
+            ).outerjoin(
+                Document, Document.document_type_id == DocumentType.id
+            ).filter(
+                DocumentType.id.in_(skipped_ids)
+            ).group_by(
+                DocumentType.id, DocumentType.is_system_type
+            ).order_by(DocumentType.id).all()
+        
+        missing_ids = skipped_ids - {row.id for row in skipped}
+        if missing_ids:
+            errors.append({
+                "error": "Algunos tipos no fueron encontrados",
+                "missing_ids": sorted(missing_ids)
+            })
+        
+        for row in skipped:
+            errors.append({
+                "document_type_id": row.id,
+                "error": (
+                    "Tipo de sistema no puede ser eliminado"
+                    if row.is_system_type
+                    else f"Tiene {row.doc_count} documentos asociados"
+                )
+            })
+            error_count += 1
+    
+    else:
+        # activate / deactivate: un solo UPDATE (Core, sin instancias ORM);
+        # RETURNING da los tipos encontrados y sus códigos sin un SELECT previo
+        updated = db.execute(
+            update(DocumentType)
+            .where(DocumentType.id.in_(requested_ids))
+            .values(is_active=action == "activate")
+            .returning(DocumentType.id, DocumentType.code)
+            .execution_options(synchronize_session=False)
+        ).all()
+        affected_codes = [row.code for row in updated]
+        success_count = len(updated)
+        
+        missing_ids = requested_ids - {row.id for row in updated}
+        if missing_ids:
+            errors.append({
+                "error": "Algunos tipos no fueron encontrados",
+                "missing_ids": sorted(missing_ids)
+            })
+    
+    return DocumentTypeBulkActionResponse(
+        success_count=success_count,
+        error_count=error_count,
+        errors=errors
+    ), affected_codes
+
+
 @router.post("/bulk-action", response_model=DocumentTypeBulkActionResponse)
-async def bulk_action_document_types(
+def bulk_action_document_types(
+    background_tasks: BackgroundTasks,
     action_data: DocumentTypeBulkAction,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin),
@@ -857,6 +1476,7 @@ async def bulk_action_document_types(
     Ejecutar acción en lote sobre tipos de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         action_data: Datos de la acción en lote
         db: Sesión de base de datos
         current_user: Usuario administrador
@@ -866,72 +1486,19 @@ async def bulk_action_document_types(
         DocumentTypeBulkActionResponse: Resultado de la operación
     """
     try:
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        # Obtener tipos de documento
-        document_types = db.query(DocumentType).filter(
-            DocumentType.id.in_(action_data.type_ids)
-        ).all()
-        
-        if len(document_types) != len(action_data.type_ids):
-            found_ids = [dt.id for dt in document_types]
-            missing_ids = [id for id in action_data.type_ids if id not in found_ids]
-            errors.append({
-                "error": "Algunos tipos no fueron encontrados",
-                "missing_ids": missing_ids
-            })
-        
-        for document_type in document_types:
-            try:
-                if action_data.action == "activate":
-                    document_type.is_active = True
-                    success_count += 1
-                    
-                elif action_data.action == "deactivate":
-                    document_type.is_active = False
-                    success_count += 1
-                    
-                elif action_data.action == "delete":
-                    # Verificar que no sea tipo de sistema
-                    if document_type.is_system_type:
-                        errors.append({
-                            "document_type_id": document_type.id,
-                            "error": "Tipo de sistema no puede ser eliminado"
-                        })
-                        error_count += 1
-                        continue
-                    
-                    # Verificar documentos asociados
-                    doc_count = db.query(Document).filter(
-                        Document.document_type_id == document_type.id
-                    ).count()
-                    
-                    if doc_count > 0:
-                        errors.append({
-                            "document_type_id": document_type.id,
-                            "error": f"Tiene {doc_count} documentos asociados"
-                        })
-                        error_count += 1
-                        continue
-                    
-                    db.delete(document_type)
-                    success_count += 1
-                    
-            except Exception as e:
-                errors.append({
-                    "document_type_id": document_type.id,
-                    "error": str(e)
-                })
-                error_count += 1
+        result, affected_codes = _apply_bulk_action(
+            db, action_data.action, action_data.type_ids
+        )
+        success_count = result.success_count
+        error_count = result.error_count
         
         # Commit cambios
         if success_count > 0:
             db.commit()
+            invalidate_document_type_code_cache(*affected_codes)
         
         # Log de acción en lote
-        log_action("document_types_bulk_action", {
+        background_tasks.add_task(log_action, "document_types_bulk_action", {
             "action": action_data.action,
             "requested_count": len(action_data.type_ids),
             "success_count": success_count,
@@ -943,11 +1510,7 @@ async def bulk_action_document_types(
             f"{success_count} exitosas, {error_count} errores"
         )
         
-        return DocumentTypeBulkActionResponse(
-            success_count=success_count,
-            error_count=error_count,
-            errors=errors
-        )
+        return result
         
     except Exception as e:
         logger.error(f"Error en acción en lote: {str(e)}")
@@ -958,10 +1521,68 @@ async def bulk_action_document_types(
         )
 
 
+@router.post("/batch", response_model=DocumentTypeBatchResponse)
+def batch_document_types(
+    background_tasks: BackgroundTasks,
+    batch_data: DocumentTypeBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin),
+    log_action = Depends(get_request_logger),
+    _: bool = Depends(admin_rate_limit)
+):
+    """
+    Ejecutar varias acciones en lote distintas en una sola petición
+    
+    Las operaciones se aplican en orden dentro de una misma transacción: o se
+    confirman todas o, ante un error inesperado, ninguna.
+    
+    Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
+        batch_data: Operaciones del lote
+        db: Sesión de base de datos
+        current_user: Usuario administrador
+        log_action: Logger de acciones
+        
+    Returns:
+        DocumentTypeBatchResponse: Resultado de cada operación, por id
+    """
+    try:
+        responses = []
+        affected_codes = []
+        for item in batch_data.requests:
+            result, codes = _apply_bulk_action(db, item.action, item.type_ids)
+            responses.append(DocumentTypeBatchItemResult(id=item.id, **result.model_dump()))
+            affected_codes.extend(codes)
+        
+        # Commit único para todo el lote
+        if affected_codes:
+            db.commit()
+            invalidate_document_type_code_cache(*affected_codes)
+        
+        background_tasks.add_task(log_action, "document_types_batch", {
+            "operations": [
+                {"id": item.id, "action": item.action, "success_count": response.success_count}
+                for item, response in zip(batch_data.requests, responses)
+            ]
+        })
+        
+        logger.info(f"Lote de {len(responses)} operaciones sobre tipos de documento")
+        
+        return DocumentTypeBatchResponse(responses=responses)
+        
+    except Exception as e:
+        logger.error(f"Error en lote de operaciones: {str(e)}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error ejecutando lote de operaciones"
+        )
+
+
 # === ENDPOINTS DE PLANTILLAS ===
 
 @router.get("/{document_type_id}/template", response_model=DocumentTypeTemplate)
-async def get_template_info(
+def get_template_info(
     document_type: DocumentType = Depends(get_document_type_by_id)
 ):
     """
@@ -976,25 +1597,74 @@ async def get_template_info(
     template_info = DocumentTypeTemplate(
         has_template=document_type.has_template,
         template_path=document_type.template_path,
-        template_name=os.path.basename(document_type.template_path) if document_type.template_path else None
+        template_name=Path(document_type.template_path).name if document_type.template_path else None
     )
     
-    # Obtener información adicional del archivo si existe
+    # Obtener información adicional del archivo si existe (un solo stat)
     if document_type.template_path:
         try:
-            full_path = os.path.join(settings.TEMPLATES_PATH, document_type.template_path)
-            if os.path.exists(full_path):
-                stat = os.stat(full_path)
-                template_info.template_size = stat.st_size
-                template_info.last_modified = datetime.fromtimestamp(stat.st_mtime)
+            stat = (TEMPLATES_DIR / document_type.template_path).stat()
+            template_info.template_size = stat.st_size
+            template_info.last_modified = datetime.fromtimestamp(stat.st_mtime)
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.warning(f"Error obteniendo info de plantilla: {str(e)}")
     
     return template_info
 
 
+def _write_template_file(source, destination: Path) -> Tuple[int, str]:
+    """
+    Copiar una plantilla subida a disco, validándola durante la copia
+    
+    Se copia por bloques (la memoria no depende del tamaño del archivo); la
+    firma .docx se comprueba en el primer bloque y el tamaño máximo en cada
+    uno, así que un archivo inválido o demasiado grande se corta sin escribir
+    el resto. Si algo falla se elimina el archivo parcial.
+    
+    Args:
+        source: Archivo subido (file-like binario)
+        destination: Ruta de destino
+        
+    Returns:
+        Tuple[int, str]: Tamaño en bytes y checksum BLAKE2b (hex)
+        
+    Raises:
+        HTTPException: Si el archivo no es .docx o supera MAX_TEMPLATE_SIZE
+    """
+    file_size = 0
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(destination, "wb") as buffer:
+            while chunk := source.read(TEMPLATE_CHUNK_SIZE):
+                if file_size == 0 and not chunk.startswith(DOCX_SIGNATURE):
+                    break
+                file_size += len(chunk)
+                if file_size > settings.MAX_TEMPLATE_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"La plantilla supera el tamaño máximo de {settings.MAX_TEMPLATE_SIZE // (1024 * 1024)}MB"
+                    )
+                buffer.write(chunk)
+                digest.update(chunk)
+        
+        # Vacío o sin la firma ZIP
+        if file_size == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El archivo no es un .docx válido"
+            )
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    
+    return file_size, digest.hexdigest()
+
+
 @router.post("/{document_type_id}/template")
-async def upload_template(
+def upload_template(
+    background_tasks: BackgroundTasks,
     document_type_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
@@ -1005,6 +1675,7 @@ async def upload_template(
     Subir plantilla para tipo de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type_id: ID del tipo de documento
         file: Archivo de plantilla
         db: Sesión de base de datos
@@ -1039,31 +1710,29 @@ async def upload_template(
         new_filename = f"{safe_code}_template_{timestamp}.docx"
         
         # Guardar archivo
-        template_path = os.path.join(settings.TEMPLATES_PATH, new_filename)
+        template_path = TEMPLATES_DIR / new_filename
         
-        with open(template_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        file_size, checksum = _write_template_file(file.file, template_path)
         
         # Eliminar plantilla anterior si existe
         if document_type.template_path:
-            old_path = os.path.join(settings.TEMPLATES_PATH, document_type.template_path)
             try:
-                if os.path.exists(old_path):
-                    os.remove(old_path)
+                (TEMPLATES_DIR / document_type.template_path).unlink(missing_ok=True)
             except Exception as e:
                 logger.warning(f"Error eliminando plantilla anterior: {str(e)}")
         
         # Actualizar tipo de documento
         document_type.template_path = new_filename
         db.commit()
+        invalidate_document_type_code_cache(document_type.code)
         
         # Log de subida
-        log_action("template_uploaded", {
+        background_tasks.add_task(log_action, "template_uploaded", {
             "document_type_id": document_type.id,
             "code": document_type.code,
             "filename": new_filename,
-            "file_size": len(content)
+            "file_size": file_size,
+            "checksum": checksum
         })
         
         logger.info(f"Plantilla subida para {document_type.code}: {new_filename}")
@@ -1071,7 +1740,8 @@ async def upload_template(
         return {
             "message": "Plantilla subida exitosamente",
             "filename": new_filename,
-            "size": len(content),
+            "size": file_size,
+            "checksum": checksum,
             "timestamp": datetime.utcnow().isoformat()
         }
         
@@ -1086,7 +1756,7 @@ async def upload_template(
 
 
 @router.get("/{document_type_id}/template/download")
-async def download_template(
+def download_template(
     document_type: DocumentType = Depends(get_document_type_by_id),
     current_user: User = Depends(get_current_user),
     log_action = Depends(get_request_logger)
@@ -1109,9 +1779,15 @@ async def download_template(
                 detail="Este tipo de documento no tiene plantilla"
             )
         
-        template_path = os.path.join(settings.TEMPLATES_PATH, document_type.template_path)
+        template_path = TEMPLATES_DIR / document_type.template_path
+        
+        # Un solo stat: comprueba el archivo y se reutiliza en FileResponse
+        try:
+            stat_result = template_path.stat()
+        except FileNotFoundError:
+            stat_result = None
         
-        if not os.path.exists(template_path):
+        if stat_result is None or not S_ISREG(stat_result.st_mode):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Archivo de plantilla no encontrado"
@@ -1127,10 +1803,24 @@ async def download_template(
         # Nombre de descarga amigable
         download_name = f"plantilla_{document_type.code.lower()}.docx"
         
+        if settings.TEMPLATES_ACCEL_REDIRECT_PREFIX:
+            # nginx envía el archivo (sendfile) y el worker queda libre
+            return Response(
+                media_type=TEMPLATE_MEDIA_TYPE,
+                headers={
+                    "X-Accel-Redirect": (
+                        settings.TEMPLATES_ACCEL_REDIRECT_PREFIX.rstrip("/")
+                        + "/" + quote(document_type.template_path)
+                    ),
+                    "Content-Disposition": f'attachment; filename="{download_name}"'
+                }
+            )
+        
         return FileResponse(
             path=template_path,
             filename=download_name,
-            media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            media_type=TEMPLATE_MEDIA_TYPE,
+            stat_result=stat_result
         )
         
     except HTTPException:
@@ -1144,7 +1834,8 @@ async def download_template(
 
 
 @router.delete("/{document_type_id}/template")
-async def delete_template(
+def delete_template(
+    background_tasks: BackgroundTasks,
     document_type: DocumentType = Depends(get_document_type_by_id),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_manage_types_permission),
@@ -1154,6 +1845,7 @@ async def delete_template(
     Eliminar plantilla del tipo de documento
     
     Args:
+        background_tasks: Tareas a ejecutar después de la respuesta
         document_type: Tipo de documento
         db: Sesión de base de datos
         current_user: Usuario actual
@@ -1170,10 +1862,8 @@ async def delete_template(
             )
         
         # Eliminar archivo físico
-        template_path = os.path.join(settings.TEMPLATES_PATH, document_type.template_path)
         try:
-            if os.path.exists(template_path):
-                os.remove(template_path)
+            (TEMPLATES_DIR / document_type.template_path).unlink(missing_ok=True)
         except Exception as e:
             logger.warning(f"Error eliminando archivo de plantilla: {str(e)}")
         
@@ -1181,9 +1871,10 @@ async def delete_template(
         old_template = document_type.template_path
         document_type.template_path = None
         db.commit()
+        invalidate_document_type_code_cache(document_type.code)
         
         # Log de eliminación
-        log_action("template_deleted", {
+        background_tasks.add_task(log_action, "template_deleted", {
             "document_type_id": document_type.id,
             "code": document_type.code,
             "deleted_template": old_template
@@ -1206,138 +1897,3 @@ async def delete_template(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al eliminar plantilla"
         )
-
-
-# === ENDPOINTS DE EXPORTACIÓN ===
-
-@router.get("/export", response_model=List[DocumentTypeExport])
-async def export_document_types(
-    format: str = Query("json", regex="^(json|csv)$"),
-    include_inactive: bool = Query(False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_admin),
-    log_action = Depends(get_request_logger)
-):
-    """
-    Exportar tipos de documento
-    
-    Args:
-        format: Formato de exportación (json, csv)
-        include_inactive: Incluir tipos inactivos
-        db: Sesión de base de datos
-        current_user: Usuario administrador
-        log_action: Logger de acciones
-        
-    Returns:
-        List[DocumentTypeExport]: Datos exportados
-    """
-    try:
-        # Query base
-        query = db.query(DocumentType)
-        
-        if not include_inactive:
-            query = query.filter(DocumentType.is_active == True)
-        
-        document_types = query.all()
-        
-        # Convertir a formato de exportación
-        export_data = [
-            DocumentTypeExport.from_orm(dt) for dt in document_types
-        ]
-        
-        # Log de exportación
-        log_action("document_types_exported", {
-            "format": format,
-            "count": len(export_data),
-            "include_inactive": include_inactive
-        })
-        
-        logger.info(f"Exportados {len(export_data)} tipos de documento en formato {format}")
-        
-        return export_data
-        
-    except Exception as e:
-        logger.error(f"Error exportando tipos de documento: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al exportar tipos de documento"
-        )
-
-
-# === ENDPOINTS DE ESTADÍSTICAS ===
-
-@router.get("/stats")
-async def get_document_types_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Obtener estadísticas de tipos de documento
-    
-    Args:
-        db: Sesión de base de datos
-        current_user: Usuario actual
-        
-    Returns:
-        dict: Estadísticas de tipos de documento
-    """
-    try:
-        # Estadísticas básicas
-        total_types = db.query(DocumentType).count()
-        active_types = db.query(DocumentType).filter(DocumentType.is_active == True).count()
-        types_with_qr = db.query(DocumentType).filter(DocumentType.requires_qr == True).count()
-        types_with_templates = db.query(DocumentType).filter(
-            DocumentType.template_path.isnot(None)
-        ).count()
-        
-        # Tipos más usados (por documentos)
-        top_types = db.query(
-            DocumentType.code,
-            DocumentType.name,
-            func.count(Document.id).label('document_count')
-        ).outerjoin(Document).group_by(
-            DocumentType.id, DocumentType.code, DocumentType.name
-        ).order_by(func.count(Document.id).desc()).limit(5).all()
-        
-        # Distribución por estado
-        status_distribution = {
-            "active": active_types,
-            "inactive": total_types - active_types
-        }
-        
-        # Distribución por características
-        feature_distribution = {
-            "requires_qr": types_with_qr,
-            "has_template": types_with_templates,
-            "requires_approval": db.query(DocumentType).filter(
-                DocumentType.requires_approval == True
-            ).count()
-        }
-        
-        return {
-            "summary": {
-                "total_types": total_types,
-                "active_types": active_types,
-                "inactive_types": total_types - active_types,
-                "with_qr": types_with_qr,
-                "with_templates": types_with_templates
-            },
-            "status_distribution": status_distribution,
-            "feature_distribution": feature_distribution,
-            "top_used_types": [
-                {
-                    "code": code,
-                    "name": name,
-                    "document_count": count
-                }
-                for code, name, count in top_types
-            ],
-            "generated_at": datetime.utcnow().isoformat()
-        }
-        
-    except Exception as e:
-        logger.error(f"Error obteniendo estadísticas: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error al obtener estadísticas"
-        )
\ No newline at end of file
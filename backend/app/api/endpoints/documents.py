@@ -44,8 +44,9 @@ from ..deps import (
     require_admin,
     require_upload_permission,
     get_document_by_id,
-    verify_document_ownership_or_admin,
+    get_document_for_modification,
     PaginationParams,
+    get_pagination_params,
     get_request_logger,
     create_rate_limit_dependency
 )
@@ -90,7 +91,7 @@ async def list_documents(
     has_qr: Optional[bool] = Query(None, description="Filtrar por presencia de QR"),
     
     # Paginación
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: PaginationParams = Depends(get_pagination_params),
     
     # Dependencias
     db: Session = Depends(get_db),
@@ -400,7 +401,7 @@ async def upload_documents_batch(
 @router.put("/{document_id}", response_model=DocumentSchema)
 async def update_document(
     update_data: DocumentUpdate,
-    document: Document = Depends(verify_document_ownership_or_admin),
+    document: Document = Depends(get_document_for_modification),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     log_action = Depends(get_request_logger)
@@ -654,7 +655,7 @@ async def download_document(
 @router.delete("/{document_id}")
 async def delete_document(
     force: bool = Query(False, description="Eliminación permanente"),
-    document: Document = Depends(verify_document_ownership_or_admin),
+    document: Document = Depends(get_document_for_modification),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     log_action = Depends(get_request_logger)
@@ -24,6 +24,7 @@ from ...schemas.document import (
 from ..deps import (
     get_current_user,
     PaginationParams,
+    get_pagination_params,
     get_request_logger
 )
 
@@ -111,7 +112,7 @@ async def search_all(
     is_confidential: Optional[bool] = Query(None, description="Documentos confidenciales"),
     
     # Paginación y ordenamiento
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: PaginationParams = Depends(get_pagination_params),
     
     # Dependencias
     db: Session = Depends(get_db),
@@ -245,7 +246,7 @@ async def search_documents_only(
     search_content: bool = Query(False, description="Buscar en contenido extraído"),
     
     # Paginación
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: PaginationParams = Depends(get_pagination_params),
     
     # Dependencias
     db: Session = Depends(get_db),
@@ -388,7 +389,7 @@ async def search_qr_codes(
     status: Optional[str] = Query(None, description="Estado del QR"),
     document_type_id: Optional[int] = Query(None, description="Tipo de documento"),
     
-    pagination: PaginationParams = Depends(PaginationParams),
+    pagination: PaginationParams = Depends(get_pagination_params),
     
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -1,7 +1,8 @@
 """
 Configuración de la aplicación SGD Web
 """
-from typing import List, Optional
+from functools import cached_property
+from typing import FrozenSet, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import validator
 
@@ -27,6 +28,12 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "sgd_db"
     POSTGRES_PORT: int = 5432
     
+    # Pool de conexiones: los endpoints síncronos corren en el threadpool de
+    # FastAPI (40 hilos por defecto), así que pool + overflow cubren esos hilos
+    DB_POOL_SIZE: int = 25
+    DB_POOL_OVERFLOW: int = 15
+    DB_POOL_RECYCLE: int = 300  # Segundos antes de descartar una conexión
+    
     @property
     def DATABASE_URL(self) -> str:
         """URL de conexión a PostgreSQL"""
@@ -95,6 +102,10 @@ class Settings(BaseSettings):
     DOCUMENTS_PATH: str = "/app/storage/documents"
     TEMP_PATH: str = "/app/storage/temp"
     TEMPLATES_PATH: str = "/app/templates"
+    # Si se define (p. ej. "/protected-templates/"), las descargas de plantillas
+    # se delegan al proxy con X-Accel-Redirect y nginx envía el archivo; requiere
+    # una location "internal" que apunte a TEMPLATES_PATH
+    TEMPLATES_ACCEL_REDIRECT_PREFIX: Optional[str] = None
     
     # OneDrive configuración
     ONEDRIVE_SYNC_PATH: str = "/app/storage/documents"
@@ -103,6 +114,8 @@ class Settings(BaseSettings):
     # === CONFIGURACIÓN DE ARCHIVOS ===
     # Tamaño máximo de archivo en bytes (50MB por defecto)
     MAX_FILE_SIZE: int = 50 * 1024 * 1024
+    # Tamaño máximo de plantillas .docx en bytes
+    MAX_TEMPLATE_SIZE: int = 50 * 1024 * 1024
     
     # Tipos de archivo permitidos
     ALLOWED_FILE_TYPES: List[str] = [
@@ -137,6 +150,10 @@ class Settings(BaseSettings):
     # === CONFIGURACIÓN DE CACHE ===
     CACHE_TTL: int = 300  # 5 minutos en segundos
     
+    # Redis compartido entre workers (rate limiting, cache). Si no se define
+    # se usan las implementaciones en memoria de cada proceso.
+    REDIS_URL: Optional[str] = None  # redis://:password@redis:6379/0
+    
     # === CONFIGURACIÓN DE ROLES ===
     DEFAULT_USER_ROLE: str = "viewer"
     ADMIN_EMAILS_STR: Optional[str] = None  # Emails de admin separados por comas
@@ -151,6 +168,18 @@ class Settings(BaseSettings):
             return emails if emails else []
         return []
     
+    # Versiones en conjunto (minúsculas) para verificar pertenencia en cada login
+    # sin recorrer ni reconstruir las listas
+    @cached_property
+    def ADMIN_EMAILS_SET(self) -> FrozenSet[str]:
+        """Emails de administradores en minúsculas"""
+        return frozenset(self.ADMIN_EMAILS)
+    
+    @cached_property
+    def ALLOWED_DOMAINS_SET(self) -> FrozenSet[str]:
+        """Dominios permitidos en minúsculas (vacío si no hay restricción)"""
+        return frozenset(domain.lower() for domain in self.ALLOWED_DOMAINS or ())
+    
     # === CONFIGURACIÓN DE AUTENTICACIÓN LOCAL ===
     LOCAL_AUTH_ENABLED: bool = True
     DEMO_MODE: bool = True
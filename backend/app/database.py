@@ -18,10 +18,11 @@ logger = logging.getLogger(__name__)
 # Crear engine de SQLAlchemy
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verificar conexiones antes de usarlas
-    pool_recycle=300,    # Reciclar conexiones cada 5 minutos
-    pool_size=5,         # Pool de 5 conexiones
-    max_overflow=0,      # No permitir conexiones adicionales
+    pool_pre_ping=False, # Sin SELECT 1 en cada checkout; pool_recycle descarta conexiones viejas
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_POOL_OVERFLOW,  # Conexiones adicionales en picos de carga
+    pool_use_lifo=True,  # Reusar la conexión más reciente; las sobrantes quedan ociosas y se reciclan
     echo=settings.DEBUG, # Mostrar SQL queries en desarrollo
 )
 
@@ -64,6 +65,10 @@ def create_tables():
     Solo para desarrollo/testing. En producción usar Alembic.
     """
     try:
+        if engine.dialect.name == "postgresql":
+            # users.email es citext (igual que en la migración inicial)
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS citext"))
         Base.metadata.create_all(bind=engine)
         logger.info("Tablas creadas exitosamente")
     except Exception as e:
@@ -4,6 +4,7 @@ FastAPI con integración Microsoft 365 y gestión documental
 """
 import os
 import sys
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -25,6 +26,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from .config import get_settings, is_development, is_production
 from .database import get_db, check_database_connection, database_health_check
 from .models import initialize_models
+from .api.deps import flush_user_activity, ACTIVITY_FLUSH_INTERVAL
+from .utils.http_client import close_http_client
 
 # Importar routers de endpoints
 from .api.endpoints import (
@@ -52,6 +55,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def user_activity_flush_loop():
+    """Persistir periódicamente la última actividad de los usuarios"""
+    while True:
+        await asyncio.sleep(ACTIVITY_FLUSH_INTERVAL)
+        await asyncio.to_thread(flush_user_activity)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
@@ -93,6 +103,9 @@ async def lifespan(app: FastAPI):
         os.makedirs("logs", exist_ok=True)
         logger.info("✅ Estructura de carpetas verificada")
         
+        # Escritura en lote de la actividad de usuarios
+        app.state.activity_flush_task = asyncio.create_task(user_activity_flush_loop())
+        
         # Configurar aplicación
         app.state.startup_time = datetime.utcnow()
         app.state.version = settings.VERSION
@@ -110,6 +123,9 @@ async def lifespan(app: FastAPI):
     
     # === SHUTDOWN ===
     logger.info("🛑 Cerrando SGD Web...")
+    app.state.activity_flush_task.cancel()
+    await asyncio.to_thread(flush_user_activity)
+    await close_http_client()
     logger.info("✅ SGD Web cerrado correctamente")
 
 
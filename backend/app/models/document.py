@@ -2,7 +2,8 @@
 Modelo de Documento para SGD Web
 Modelo principal que representa los documentos registrados en el sistema
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, BigInteger, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
@@ -23,7 +24,7 @@ class Document(Base):
     __tablename__ = "documents"
     
     # === CAMPOS PRINCIPALES ===
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # === IDENTIFICACIÓN ===
     # Código QR asociado (si aplica)
@@ -85,7 +86,9 @@ class Document(Base):
     
     # === CLASIFICACIÓN Y ORGANIZACIÓN ===
     # Tags y categorización
-    tags = Column(JSON)  # Lista de tags para búsqueda
+    # Lista de tags para búsqueda; jsonb (como en la migración) para que
+    # tags.contains() compile a @> y use ix_documents_tags_gin
+    tags = Column(JSONB)
     category = Column(String(100))  # Categoría adicional
     priority = Column(Integer, default=0)  # Prioridad (0=normal, 1=alta, -1=baja)
     
@@ -101,6 +104,11 @@ class Document(Base):
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
     
+    # Documentos por usuario, más recientes primero (verificación de dueño y estadísticas)
+    __table_args__ = (
+        Index("ix_documents_uploaded_by_created", uploaded_by, created_at.desc()),
+    )
+    
     # Historial de cambios
     version = Column(Integer, default=1)  # Versión del documento
     change_log = Column(JSON)  # Log de cambios
@@ -2,16 +2,30 @@
 Modelo de Tipo de Documento para SGD Web
 Permite configurar diferentes tipos de documentos con sus respectivos requisitos
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+import re
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 
 from ..database import Base
 
 
+# Campos base requeridos: (columna que lo activa, campo, etiqueta para errores)
+BASE_REQUIRED_FIELDS = (
+    ("requires_cedula", "cedula", "Cédula"),
+    ("requires_nombre", "nombre", "Nombre completo"),
+    ("requires_telefono", "telefono", "Teléfono"),
+    ("requires_email", "email", "Email"),
+    ("requires_direccion", "direccion", "Dirección"),
+)
+BASE_FIELD_LABELS = {field: label for _, field, label in BASE_REQUIRED_FIELDS}
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+
 class DocumentType(Base):
     """
     Modelo para tipos de documento configurables
@@ -22,7 +36,7 @@ class DocumentType(Base):
     __tablename__ = "document_types"
     
     # === CAMPOS PRINCIPALES ===
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Identificación del tipo
     code = Column(String(20), unique=True, nullable=False, index=True)
@@ -87,6 +101,29 @@ class DocumentType(Base):
     documents_count = Column(Integer, default=0)  # Documentos registrados de este tipo
     generated_count = Column(Integer, default=0)  # Documentos generados de este tipo
     
+    # Paginación por cursor: un índice (columna de orden, id) por cada sort_by
+    # del listado (code ya es único). Las columnas que admiten NULL se ordenan
+    # por COALESCE(col, 0), igual que en el listado.
+    __table_args__ = (
+        Index("ix_document_types_name_id", name, id),
+        Index("ix_document_types_created_at_id", created_at, id),
+        Index("ix_document_types_updated_at_id", updated_at, id),
+        Index("ix_document_types_documents_count_id", func.coalesce(documents_count, 0), id),
+        Index("ix_document_types_sort_order_id", func.coalesce(sort_order, 0), id),
+        # Filtros del listado: no admins (solo activos), can_generate=true y creador
+        Index("ix_document_types_active_sort", is_active, func.coalesce(sort_order, 0), id),
+        Index(
+            "ix_document_types_generatable",
+            sort_order,
+            postgresql_where=template_path.isnot(None) & is_active,
+        ),
+        Index("ix_document_types_created_by_id", created_by, id),
+        # Búsqueda por prefijo de código (LIKE 'ABC%' con cualquier collation)
+        Index("ix_document_types_code_prefix", code, postgresql_ops={"code": "text_pattern_ops"}),
+        # Los índices trigram de la búsqueda requieren pg_trgm y solo se crean
+        # en la migración 20251016_dt_filters
+    )
+    
     # === RELACIONES ===
     # Usuario que creó este tipo
     created_by_user = relationship("User", back_populates="created_document_types")
@@ -153,23 +190,15 @@ class DocumentType(Base):
     @property
     def required_fields(self) -> list:
         """Obtener lista de campos requeridos (base + custom)"""
-        fields = []
-        if self.requires_cedula:
-            fields.append("cedula")
-        if self.requires_nombre:
-            fields.append("nombre")
-        if self.requires_telefono:
-            fields.append("telefono")
-        if self.requires_email:
-            fields.append("email")
-        if self.requires_direccion:
-            fields.append("direccion")
         # Note: QR is not in required_fields because it's now optional (TIENE_QR pattern)
+        fields = [field for flag, field, _ in BASE_REQUIRED_FIELDS if getattr(self, flag)]
 
         # Add custom required fields
-        for custom_field in self.custom_fields_list:
-            if custom_field.get("required", False):
-                fields.append(custom_field["id"])
+        fields.extend(
+            custom_field["id"]
+            for custom_field in self.custom_fields_list
+            if custom_field.get("required", False)
+        )
 
         return fields
     
@@ -208,54 +237,46 @@ class DocumentType(Base):
         max_bytes = self.max_file_size_mb * 1024 * 1024
         return size_bytes <= max_bytes
     
-    def validate_document_data(self, data: dict) -> tuple[bool, list]:
+    def validate_document_data(
+        self,
+        data: dict,
+        required_fields: Optional[list] = None
+    ) -> tuple[bool, list]:
         """
         Validar datos de documento según los requisitos del tipo
 
         Args:
             data: Diccionario con datos del documento
+            required_fields: Campos requeridos ya calculados (por defecto
+                self.required_fields)
 
         Returns:
             tuple: (is_valid, errors_list)
         """
         errors = []
+        if required_fields is None:
+            required_fields = self.required_fields
+        additional_data = data.get("additional_data", {})
+        custom_fields = self.custom_fields_list
 
-        # Validar campos base requeridos
-        base_field_names = {
-            "cedula": "Cédula",
-            "nombre": "Nombre completo",
-            "telefono": "Teléfono",
-            "email": "Email",
-            "direccion": "Dirección"
-        }
-
-        for field in self.required_fields:
+        for field in required_fields:
             # Check if it's a base field or custom field
-            if field in base_field_names:
-                if field not in data or not data[field]:
-                    errors.append(f"{base_field_names[field]} es requerido")
-            else:
-                # It's a custom field - check in additional_data
-                additional_data = data.get("additional_data", {})
-                if field not in additional_data or not additional_data[field]:
-                    # Find the custom field label
-                    custom_field = next(
-                        (cf for cf in self.custom_fields_list if cf["id"] == field),
-                        None
-                    )
-                    field_label = custom_field["label"] if custom_field else field
-                    errors.append(f"{field_label} es requerido")
+            if field in BASE_FIELD_LABELS:
+                if not data.get(field):
+                    errors.append(f"{BASE_FIELD_LABELS[field]} es requerido")
+            elif not additional_data.get(field):
+                # It's a custom field - find its label
+                custom_field = next((cf for cf in custom_fields if cf["id"] == field), None)
+                field_label = custom_field["label"] if custom_field else field
+                errors.append(f"{field_label} es requerido")
 
         # Validar email si está presente
-        if "email" in data and data["email"]:
-            import re
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            if not re.match(email_pattern, data["email"]):
+        if data.get("email"):
+            if not EMAIL_PATTERN.match(data["email"]):
                 errors.append("Email no tiene formato válido")
 
         # Validar tipos de datos en campos personalizados
-        additional_data = data.get("additional_data", {})
-        for custom_field in self.custom_fields_list:
+        for custom_field in custom_fields:
             field_id = custom_field["id"]
             if field_id in additional_data and additional_data[field_id]:
                 value = additional_data[field_id]
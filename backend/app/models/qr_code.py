@@ -23,7 +23,7 @@ class QRCode(Base):
     __tablename__ = "qr_codes"
     
     # === CAMPOS PRINCIPALES ===
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Identificador único del QR (UUID4)
     qr_id = Column(String(255), unique=True, nullable=False, index=True)
@@ -47,7 +47,7 @@ class QRCode(Base):
     
     # === AUDITORÍA ===
     # Usuario que generó el QR
-    generated_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    generated_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     
     # Fechas importantes
     created_at = Column(DateTime, default=func.now(), nullable=False)
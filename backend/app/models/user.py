@@ -3,8 +3,9 @@
 Modelo de Usuario para SGD Web
 Integrado con Microsoft 365 / Azure AD
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, Index
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import CITEXT
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -39,11 +40,13 @@ class User(Base):
     __tablename__ = "users"
     
     # === CAMPOS PRINCIPALES ===
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # Identificación de Microsoft
     azure_id = Column(String(255), unique=True, nullable=True, index=True)  # Nullable para usuarios locales
-    email = Column(String(100), unique=True, nullable=False, index=True)
+    # citext como en la migración: comparaciones sin distinguir mayúsculas.
+    # Único solo entre usuarios activos (ver ix_users_email_active en __table_args__)
+    email = Column(CITEXT(), nullable=False)
 
     # Autenticación local (opcional, para modo demo/desarrollo)
     password_hash = Column(String(255), nullable=True)  # Solo para usuarios locales
@@ -62,15 +65,30 @@ class User(Base):
     company_name = Column(String(100))
     
     # === CONFIGURACIÓN DEL SISTEMA ===
+    # VARCHAR + CHECK como en la migración (sin tipos ENUM nativos)
     role = Column(
-        Enum(UserRole, values_callable=lambda x: [e.value for e in x]),
+        Enum(
+            UserRole,
+            values_callable=lambda x: [e.value for e in x],
+            native_enum=False,
+            length=16,
+            create_constraint=True,
+            name="ck_users_role",
+        ),
         nullable=False,
         default=UserRole.VIEWER,
         index=True
     )
 
     status = Column(
-        Enum(UserStatus, values_callable=lambda x: [e.value for e in x]),
+        Enum(
+            UserStatus,
+            values_callable=lambda x: [e.value for e in x],
+            native_enum=False,
+            length=16,
+            create_constraint=True,
+            name="ck_users_status",
+        ),
         nullable=False,
         default=UserStatus.PENDING,
         index=True
@@ -110,6 +128,16 @@ class User(Base):
     created_at = Column(DateTime, default=func.now(), nullable=False)
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
     
+    # Login local: índice parcial solo con los usuarios locales
+    __table_args__ = (
+        Index("ix_users_local_email", email, postgresql_where=is_local_user),
+        # Email único solo entre usuarios activos: un usuario desactivado no
+        # bloquea su email. El índice no único atiende búsquedas por emails
+        # históricos.
+        Index("ix_users_email_active", email, unique=True, postgresql_where=is_active == True),
+        Index("ix_users_email_lookup", email),
+    )
+    
     # === INFORMACIÓN ADICIONAL ===
     # Notas del administrador
     admin_notes = Column(Text)
@@ -269,6 +297,9 @@ class User(Base):
         """
         Desactivar usuario
         
+        Tras el commit, el llamador debe descartar el usuario cacheado
+        (invalidate_user_cache en app.api.deps).
+        
         Args:
             reason: Razón de la desactivación
         """
@@ -278,7 +309,7 @@ class User(Base):
             self.admin_notes = f"{self.admin_notes or ''}\n[{datetime.utcnow()}] Desactivado: {reason}".strip()
     
     def reactivate(self):
-        """Reactivar usuario"""
+        """Reactivar usuario (tras el commit, invalidar la caché como en deactivate)"""
         self.is_active = True
         self.status = UserStatus.ACTIVE
         self.admin_notes = f"{self.admin_notes or ''}\n[{datetime.utcnow()}] Reactivado".strip()
@@ -287,6 +318,9 @@ class User(Base):
         """
         Suspender usuario temporalmente
 
+        Tras el commit, el llamador debe descartar el usuario cacheado
+        (invalidate_user_cache en app.api.deps).
+
         Args:
             reason: Razón de la suspensión
         """
@@ -314,9 +348,25 @@ class User(Base):
         Returns:
             bool: True si la contraseña es correcta
         """
-        if not self.password_hash or not self.is_local_user:
+        if not self.is_local_user:
+            return False
+        return User.check_password(password, self.password_hash)
+
+    @staticmethod
+    def check_password(password: str, password_hash: Optional[str]) -> bool:
+        """
+        Verificar una contraseña contra un hash bcrypt (sin instancia de User)
+
+        Args:
+            password: Contraseña en texto plano a verificar
+            password_hash: Hash bcrypt almacenado
+
+        Returns:
+            bool: True si la contraseña es correcta
+        """
+        if not password_hash:
             return False
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
 
     def to_dict(self) -> dict:
         """Convertir usuario a diccionario para APIs"""
@@ -72,6 +72,10 @@ from .document_type import (
     DocumentTypeClone,
     DocumentTypeBulkAction,
     DocumentTypeBulkActionResponse,
+    DocumentTypeBatchItem,
+    DocumentTypeBatchRequest,
+    DocumentTypeBatchItemResult,
+    DocumentTypeBatchResponse,
     DocumentTypeTemplate,
     DocumentTypeTemplateUpload,
     DocumentTypeExport,
@@ -180,6 +184,8 @@ __all__ = [
     "DocumentTypeValidation", "DocumentTypeValidationResponse",
     "DocumentTypeFilter", "DocumentTypeListResponse",
     "DocumentTypeClone", "DocumentTypeBulkAction", "DocumentTypeBulkActionResponse",
+    "DocumentTypeBatchItem", "DocumentTypeBatchRequest", "DocumentTypeBatchItemResult",
+    "DocumentTypeBatchResponse",
     "DocumentTypeTemplate", "DocumentTypeTemplateUpload", "DocumentTypeExport",
     
     # === QR_CODE SCHEMAS ===
@@ -221,7 +227,9 @@ DOCUMENT_TYPE_SCHEMAS = {
     "response": [DocumentType, DocumentTypeSummary, DocumentTypeStats],
     "validation": [DocumentTypeValidation, DocumentTypeValidationResponse],
     "operations": [DocumentTypeFilter, DocumentTypeListResponse, DocumentTypeClone,
-                   DocumentTypeBulkAction, DocumentTypeBulkActionResponse],
+                   DocumentTypeBulkAction, DocumentTypeBulkActionResponse,
+                   DocumentTypeBatchItem, DocumentTypeBatchRequest,
+                   DocumentTypeBatchItemResult, DocumentTypeBatchResponse],
 }
 
 QR_CODE_SCHEMAS = {
@@ -316,10 +316,12 @@ class DocumentTypeFilter(BaseModel):
 class DocumentTypeListResponse(BaseModel):
     """Esquema para respuesta de lista"""
     document_types: List[DocumentTypeSummary] = Field(description="Lista de tipos")
-    total: int = Field(description="Total de tipos")
+    total: Optional[int] = Field(None, description="Total de tipos (solo con include_total=true)")
     page: int = Field(description="Página actual")
     page_size: int = Field(description="Tamaño de página")
-    total_pages: int = Field(description="Total de páginas")
+    total_pages: Optional[int] = Field(None, description="Total de páginas")
+    has_more: bool = Field(description="Hay más resultados después de esta página")
+    next_cursor: Optional[str] = Field(None, description="Cursor para pedir la página siguiente")
 
 
 # === ESQUEMAS PARA OPERACIONES ESPECIALES ===
@@ -361,6 +363,26 @@ class DocumentTypeBulkActionResponse(BaseModel):
     errors: List[Dict[str, Any]] = Field(description="Detalles de errores")
 
 
+class DocumentTypeBatchItem(DocumentTypeBulkAction):
+    """Esquema para una operación dentro de un lote mixto"""
+    id: str = Field(..., min_length=1, max_length=50, description="Identificador de la operación (definido por el cliente)")
+
+
+class DocumentTypeBatchRequest(BaseModel):
+    """Esquema para un lote de acciones distintas en una sola petición"""
+    requests: List[DocumentTypeBatchItem] = Field(..., min_length=1, max_length=50, description="Operaciones a ejecutar en orden")
+
+
+class DocumentTypeBatchItemResult(DocumentTypeBulkActionResponse):
+    """Esquema para el resultado de una operación del lote"""
+    id: str = Field(description="Identificador de la operación")
+
+
+class DocumentTypeBatchResponse(BaseModel):
+    """Esquema para respuesta de un lote de acciones"""
+    responses: List[DocumentTypeBatchItemResult] = Field(description="Resultado de cada operación, en orden")
+
+
 # === ESQUEMAS PARA PLANTILLAS ===
 
 class DocumentTypeTemplate(BaseModel):
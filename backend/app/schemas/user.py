@@ -213,7 +213,9 @@ class UserLogin(BaseModel):
 class UserLocalLogin(BaseModel):
     """Esquema para login local (demo/desarrollo)"""
     email: str = Field(description="Email del usuario")
-    password: str = Field(min_length=6, description="Contraseña del usuario")
+    # Tope de longitud: una entrada enorme se rechaza antes de consultar la base
+    # de datos o ejecutar bcrypt (que de todas formas solo usa 72 bytes)
+    password: str = Field(min_length=6, max_length=1024, description="Contraseña del usuario")
 
     @validator('email')
     def validate_email(cls, v):
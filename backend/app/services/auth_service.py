@@ -7,7 +7,7 @@ import secrets
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
 
-from jose import JWTError, jwt
+import jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
@@ -179,7 +179,7 @@ class AuthService:
             
             return payload
             
-        except JWTError as e:
+        except jwt.PyJWTError as e:
             logger.warning(f"Error decodificando token: {str(e)}")
             raise AuthenticationError("Token inválido")
         except Exception as e:
@@ -331,8 +331,7 @@ class AuthService:
         """
         try:
             # Verificar si está en la lista de administradores
-            admin_emails = [admin.lower() for admin in settings.ADMIN_EMAILS]
-            if email.lower() in admin_emails:
+            if email.lower() in settings.ADMIN_EMAILS_SET:
                 return UserRole.ADMIN
             
             # Rol por defecto
@@ -469,9 +468,8 @@ class AuthService:
                 return True  # No hay restricciones de dominio
             
             domain = email.split('@')[1].lower()
-            allowed_domains = [d.lower() for d in settings.ALLOWED_DOMAINS]
             
-            return domain in allowed_domains
+            return domain in settings.ALLOWED_DOMAINS_SET
             
         except Exception as e:
             logger.error(f"Error validando dominio de email: {str(e)}")
@@ -0,0 +1,108 @@
+"""
+Cache en memoria con expiración para SGD Web
+Evita repetir trabajo costoso (decodificar tokens, consultas frecuentes) dentro de un proceso,
+y expone el cliente Redis compartido cuando está configurado
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Cache LRU con tiempo de vida por entrada
+
+    Seguro para uso concurrente desde el threadpool de FastAPI. Las entradas
+    expiradas se descartan al leerlas y, al superar ``maxsize``, se elimina la
+    entrada usada menos recientemente.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor si existe y no ha expirado"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Guardar un valor
+
+        Args:
+            key: Clave del valor
+            value: Valor a guardar
+            ttl: Tiempo de vida en segundos (por defecto el del cache, nunca mayor)
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Eliminar una entrada y devolver su valor"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        """Vaciar el cache"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_redis_client = None
+_redis_initialized = False
+
+
+def get_redis_client():
+    """
+    Obtener cliente Redis compartido (configurado con REDIS_URL)
+    
+    Returns:
+        redis.Redis o None si Redis no está configurado o el paquete no está instalado
+    """
+    global _redis_client, _redis_initialized
+    if _redis_initialized:
+        return _redis_client
+    
+    from ..config import get_settings
+    settings = get_settings()
+    
+    if settings.REDIS_URL:
+        try:
+            import redis
+            _redis_client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5,
+            )
+        except ImportError:
+            logger.warning("Paquete redis no disponible, usando cache en memoria")
+    
+    _redis_initialized = True
+    return _redis_client
@@ -0,0 +1,34 @@
+"""
+Cliente HTTP compartido para SGD Web
+Reutiliza conexiones (keep-alive) hacia Microsoft Identity y Microsoft Graph
+en lugar de abrir una conexión TCP+TLS nueva en cada llamada
+"""
+from typing import Optional
+
+import httpx
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """
+    Obtener el cliente HTTP compartido (se crea en el primer uso)
+
+    Returns:
+        httpx.AsyncClient: Cliente con pool de conexiones
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0),
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Cerrar el cliente HTTP compartido (al apagar la aplicación)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None